@@ -0,0 +1,236 @@
+"""
+Benchmarks for matrix_power and the matrix chain planner.
+
+    python -m benchmarks.bench run [--quick] [--output results.json]
+    python -m benchmarks.bench compare baseline.json results.json
+                                       [--threshold 0.1]
+
+`run` times every benchmark and writes the results as JSON; it exits
+with status 1 if a benchmark of OVERHEAD_LIMITS is slower than allowed
+against its reference from the same run. `compare` reports the ratio of
+two result files and exits with status 1 if any benchmark got slower
+than the baseline by more than `threshold`.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import sys
+import time
+import timeit
+
+import numpy as np
+
+from src.batch_chain_order import batch_matrix_chain_order
+from src.matrix_power import matrix_power
+from src.validation import prepare_power_operand
+from src.multi_dot_execute import multi_dot_execute
+from src.multi_dot_matrix_chain_order import matrix_chain_order_from_shapes
+
+# Every benchmark is timed for at least this many seconds per repeat
+MIN_TIME = 0.05
+REPEAT = 5
+DEFAULT_THRESHOLD = 0.1
+
+# Hot-loop benchmarks that must stay within a factor of a reference timed
+# in the same run, so the check holds on any machine:
+# name -> (reference, largest ratio)
+OVERHEAD_LIMITS = {
+    'matrix_power/small/size=4/n=2':
+        ('numpy/matrix_power/size=4/n=2', 1.75),
+    'matrix_power/small/size=4/n=2/trusted':
+        ('numpy/matrix_power/size=4/n=2', 1.3),
+}
+
+def _power_benchmarks(quick):
+    rng = np.random.RandomState(0)
+    sizes = [16, 128] if quick else [16, 64, 256, 512]
+    exponents = [2, 17, 1000]
+    for size in sizes:
+        # Orthogonal, so that high powers neither overflow nor vanish into
+        # slow subnormal floats
+        a = _orthogonal(rng, size)
+        for n in exponents:
+            yield ('matrix_power/size=%d/n=%d' % (size, n),
+                   lambda a=a, n=n: matrix_power(a, n))
+
+    depths = [16] if quick else [16, 256]
+    for depth in depths:
+        a = np.array([_orthogonal(rng, 32) for _ in range(depth)])
+        yield ('matrix_power/stack=%d/size=32/n=17' % depth,
+               lambda a=a: matrix_power(a, 17))
+
+def _overhead_benchmarks(quick):
+    # numpy's own matrix_power is the validated original this module
+    # started from; thousands of calls on tiny matrices time the per-call
+    # validation and bookkeeping rather than the products
+    a = np.random.RandomState(0).rand(4, 4)
+    operand = prepare_power_operand(a)
+    yield ('numpy/matrix_power/size=4/n=2',
+           lambda: np.linalg.matrix_power(a, 2))
+    yield ('matrix_power/small/size=4/n=2', lambda: matrix_power(a, 2))
+    yield ('matrix_power/small/size=4/n=2/trusted',
+           lambda: matrix_power(operand, 2, check=False))
+
+def _orthogonal(rng, size):
+    return np.linalg.qr(rng.randn(size, size))[0]
+
+def _planner_benchmarks(quick):
+    rng = np.random.RandomState(0)
+    engines = [('loop', [10, 50]),
+               ('vectorized', [10, 100, 500] if quick
+                else [10, 100, 500, 1000, 2000]),
+               ('hu_shing', [1000] if quick else [1000, 2000, 5000])]
+    for engine, lengths in engines:
+        for n in lengths:
+            p = list(rng.randint(1, 1000, size=n + 1))
+            yield ('planner/%s/n=%d' % (engine, n),
+                   lambda p=p, engine=engine:
+                   matrix_chain_order_from_shapes(p, engine=engine))
+
+    n = 500 if quick else 2000
+    p = list(rng.randint(1, 1000, size=n + 1))
+    yield ('planner/vectorized-packed/n=%d' % n,
+           lambda: matrix_chain_order_from_shapes(p, engine='vectorized',
+                                                  packed=True))
+
+    # Many short chains, one call each against one batched call
+    chains = [[int(d) for d in rng.randint(1, 1000, size=rng.randint(4, 12))]
+              for _ in range(1000)]
+    yield ('planner/short-chains/per-call/count=1000',
+           lambda: [matrix_chain_order_from_shapes(p) for p in chains])
+    yield ('planner/short-chains/batch/count=1000',
+           lambda: batch_matrix_chain_order(chains))
+
+def _chain_benchmarks(quick):
+    rng = np.random.RandomState(0)
+    lengths = [4, 16] if quick else [4, 16, 64]
+    for n in lengths:
+        p = rng.randint(16, 256, size=n + 1)
+        arrays = [rng.rand(p[i], p[i+1]) for i in range(n)]
+        s = matrix_chain_order_from_shapes(p, engine='vectorized')
+        yield ('chain/execute/n=%d' % n,
+               lambda arrays=arrays, s=s: multi_dot_execute(arrays, s))
+
+BENCHMARKS = (_overhead_benchmarks, _power_benchmarks, _planner_benchmarks,
+              _chain_benchmarks)
+
+def time_benchmark(func, repeat=REPEAT, min_time=MIN_TIME):
+    """
+    Time `func` like timeit: the number of calls per repeat grows until a
+    repeat takes at least `min_time` seconds. Returns seconds per call.
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10**6:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+    times = [timer.timeit(number) / number for _ in range(repeat)]
+    times.sort()
+    return {'best': times[0], 'median': times[len(times) // 2],
+            'number': number, 'repeat': repeat}
+
+def run(quick=False, select=None, log=sys.stderr):
+    """
+    Time every benchmark whose name contains `select`, returning the JSON
+    document `compare` reads.
+    """
+    results = {}
+    for benchmarks in BENCHMARKS:
+        for name, func in benchmarks(quick):
+            if select and select not in name:
+                continue
+            results[name] = time_benchmark(func)
+            print('%-48s %12.6f s' % (name, results[name]['best']), file=log)
+    return {
+        'metadata': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+def check_overhead(results):
+    """
+    Return ``(name, ratio, limit)`` for every benchmark of OVERHEAD_LIMITS
+    in `results` slower than its limit times its reference.
+    """
+    failures = []
+    for name, (reference, limit) in sorted(OVERHEAD_LIMITS.items()):
+        if name in results and reference in results:
+            ratio = results[name]['best'] / results[reference]['best']
+            if ratio > limit:
+                failures.append((name, ratio, limit))
+    return failures
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Return ``(name, baseline, current, ratio)`` for every benchmark in both
+    documents, by best time, and the names of those slower by more than
+    `threshold` (0.1 for 10%).
+    """
+    rows = []
+    regressions = []
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        before = baseline['results'][name]['best']
+        after = current['results'][name]['best']
+        ratio = after / before if before else float('inf')
+        rows.append((name, before, after, ratio))
+        if ratio > 1 + threshold:
+            regressions.append(name)
+    return rows, regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest='command')
+
+    run_parser = commands.add_parser('run', help='run the benchmarks')
+    run_parser.add_argument('--output', default='benchmarks/results.json',
+                            help='JSON file receiving the results')
+    run_parser.add_argument('--quick', action='store_true',
+                            help='smaller sizes, for a fast check')
+    run_parser.add_argument('--select', help='only benchmarks whose name '
+                            'contains this string')
+
+    compare_parser = commands.add_parser(
+        'compare', help='compare results against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float,
+                                default=DEFAULT_THRESHOLD,
+                                help='tolerated slowdown, 0.1 for 10%%')
+
+    args = parser.parse_args(argv)
+    if args.command == 'run':
+        document = run(args.quick, args.select)
+        with open(args.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+        failures = check_overhead(document['results'])
+        for name, ratio, limit in failures:
+            print('%s is %.2fx its reference, above the limit of %.2fx'
+                  % (name, ratio, limit))
+        return 1 if failures else 0
+    if args.command == 'compare':
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+        rows, regressions = compare(baseline, current, args.threshold)
+        for name, before, after, ratio in rows:
+            flag = '  REGRESSION' if name in regressions else ''
+            print('%-48s %12.6f %12.6f %7.2fx%s'
+                  % (name, before, after, ratio, flag))
+        print('%d of %d benchmarks regressed by more than %.0f%%'
+              % (len(regressions), len(rows), 100 * args.threshold))
+        return 1 if regressions else 0
+    parser.print_help()
+    return 2
+
+if __name__ == '__main__':
+    sys.exit(main())
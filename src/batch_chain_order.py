@@ -0,0 +1,58 @@
+from numpy.core import double, Inf, asarray
+
+from src.multi_dot_matrix_chain_order import _FLOPS, _chain_order_vectorized
+
+def batch_matrix_chain_order(chains, return_costs=False, cost_model=None):
+    """
+    Plan many independent matrix chains in one call.
+
+    `chains` is a ragged sequence of dimension sequences p, A_i being
+    (p[i], p[i+1]). Chains of equal length are stacked into a
+    (chains, n + 1) array and their tables into (chains, n, n) tensors,
+    which the vectorized engine of `multi_dot_matrix_chain_order` fills
+    for all of them at once, with a leading batch axis. The Python
+    overhead is thus paid per diagonal of each distinct chain length
+    instead of per chain, which is what dominates planning many short
+    chains one call at a time.
+
+    Returns the list of split tables `s`, one per chain in input order and
+    identical in their upper triangle to `multi_dot_matrix_chain_order`,
+    and the list of cost tables too if `return_costs` is `True`. Tables of
+    chains with the same length are views of one tensor.
+
+    `cost_model` is as in `multi_dot_matrix_chain_order`.
+
+    Examples
+    --------
+    >>> s = batch_matrix_chain_order([[10, 100, 5, 50], [2, 3], [5, 4, 3]])
+    >>> s[0][0, 2], s[2][0, 1]
+    (1, 0)
+    """
+    cost_model = cost_model or _FLOPS
+    groups = {}
+    for index, p in enumerate(chains):
+        groups.setdefault(len(p), []).append(index)
+    if 0 in groups or 1 in groups:
+        index = min(groups.get(0, []) + groups.get(1, []))
+        raise ValueError("chain %d must contain at least two dimensions"
+                         % index)
+
+    s_tables = [None] * len(chains)
+    m_tables = [None] * len(chains)
+    for length, indices in groups.items():
+        p = asarray([chains[index] for index in indices])
+        if p.dtype.kind not in 'iu':
+            raise TypeError("dimensions must be integers, got %s" % p.dtype)
+        if (p < 0).any():
+            raise ValueError("negative dimensions are not allowed")
+        s, m = _chain_order_vectorized(p.astype(double), cost_model)
+        infeasible = m[:, 0, -1] == Inf
+        if infeasible.any():
+            raise ValueError("no order of chain %d keeps every intermediate "
+                             "within the memory budget"
+                             % indices[infeasible.argmax()])
+        for t, index in enumerate(indices):
+            s_tables[index] = s[t]
+            m_tables[index] = m[t]
+
+    return (s_tables, m_tables) if return_costs else s_tables
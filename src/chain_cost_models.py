@@ -0,0 +1,104 @@
+from numpy.core import (
+    asarray, double
+)
+
+class FlopsCostModel(object):
+    """
+    Cost of a chain ordering as its number of scalar multiplications.
+
+    This is the model `multi_dot_matrix_chain_order` has always used:
+    splitting A_i..A_j at k costs p[i]*p[k+1]*p[j+1]. Every method accepts
+    scalars or arrays so that all planner engines can share the model.
+
+    Parameters
+    ----------
+    itemsize : int
+        Bytes per element, used when estimating the memory of a plan.
+    """
+
+    def __init__(self, itemsize=8):
+        self.itemsize = itemsize
+
+    def split_cost(self, rows, inner, cols):
+        """
+        Cost of multiplying a (rows, inner) by an (inner, cols) operand.
+        """
+        return rows*inner*cols
+
+    def fits(self, rows, cols):
+        """
+        Whether a (rows, cols) intermediate may be materialized.
+        """
+        return True
+
+class MemoryCostModel(FlopsCostModel):
+    """
+    FLOPs plus the bytes of every intermediate a plan materializes.
+
+    Splitting A_i..A_j costs p[i]*p[k+1]*p[j+1] plus `bytes_weight` times
+    the size in bytes of the (p[i], p[j+1]) product it creates, so among
+    orderings with similar FLOPs the one with smaller temporaries wins.
+    Peak memory is not additive over the tree, so the byte term is the
+    usual surrogate for it; a hard limit is set with `budget` instead.
+
+    Parameters
+    ----------
+    itemsize : int
+        Bytes per element of the chain's dtype.
+    bytes_weight : float
+        How many scalar multiplications one byte of intermediate is worth.
+    budget : int, optional
+        Largest intermediate, in bytes, a plan may create. Splits needing a
+        larger one are excluded; the final product is always allowed.
+    """
+
+    def __init__(self, itemsize=8, bytes_weight=1.0, budget=None):
+        super(MemoryCostModel, self).__init__(itemsize)
+        self.bytes_weight = bytes_weight
+        self.budget = budget
+
+    def split_cost(self, rows, inner, cols):
+        return rows*inner*cols + self.bytes_weight*rows*cols*self.itemsize
+
+    def fits(self, rows, cols):
+        if self.budget is None:
+            return True
+        return asarray(rows, dtype=double)*cols*self.itemsize <= self.budget
+
+def estimate_peak_bytes(s, p, itemsize=8):
+    """
+    Estimate the peak bytes of intermediates (including the result) held
+    at once when the chain with dimensions `p` is evaluated in the order
+    of `s` by a post-order walk without buffer reuse.
+        peak(A_i..A_j) = max(peak(left),
+                             bytes(left) + peak(right),
+                             bytes(left) + bytes(right) + bytes(A_i..A_j))
+    where the inputs themselves count as zero. A power node (s[i, j] = -1)
+    peaks at three matrices of its size, the buffers of the binary ladder
+    of `matrix_power`.
+    """
+    n = len(p) - 1
+    size = {}
+    peak = {}
+    stack = [(0, n - 1, False)]
+    while stack:
+        i, j, expanded = stack.pop()
+        if i == j:
+            size[i, j] = peak[i, j] = 0
+            continue
+        k = int(s[i, j])
+        if k < 0:
+            size[i, j] = int(p[i])*int(p[j+1])*itemsize
+            peak[i, j] = 3 * size[i, j]
+            continue
+        if not expanded:
+            stack.append((i, j, True))
+            stack.append((k + 1, j, False))
+            stack.append((i, k, False))
+            continue
+        left, right = (i, k), (k + 1, j)
+        size[i, j] = int(p[i])*int(p[j+1])*itemsize
+        peak[i, j] = max(peak[left],
+                         size[left] + peak[right],
+                         size[left] + size[right] + size[i, j])
+    return peak[0, n - 1]
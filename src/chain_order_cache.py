@@ -0,0 +1,125 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from src.multi_dot_matrix_chain_order import (
+    HU_SHING_THRESHOLD, _chain_order
+)
+from src.validation import prepare_chain
+
+CacheInfo = namedtuple('CacheInfo',
+                       ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+class ChainOrderCache(object):
+    """
+    Memoize `multi_dot_matrix_chain_order` on the dimension tuple `p`.
+
+    Chains that share the same shapes share the same plan, so a repeated
+    plan costs one dictionary lookup. At most `maxsize` plans are kept; the
+    least recently used one is evicted first. The cached `s` and `m` arrays
+    are shared between callers and are therefore returned as read-only
+    views, whose writes cannot be re-enabled.
+
+    Parameters
+    ----------
+    maxsize : int
+        Maximum number of plans kept, must be positive.
+
+    Examples
+    --------
+    >>> cache = ChainOrderCache(maxsize=2)
+    >>> s = cache.order([np.ones((10, 100)), np.ones((100, 5))])
+    >>> s = cache.order([np.zeros((10, 100)), np.zeros((100, 5))])
+    >>> cache.info()
+    CacheInfo(hits=1, misses=1, evictions=0, maxsize=2, currsize=1)
+    """
+
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self._plans = OrderedDict()
+        self._lock = Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def order(self, arrays, return_costs=False, engine='loop',
+              auto_threshold=HU_SHING_THRESHOLD, check=True):
+        """
+        Same as `multi_dot_matrix_chain_order`, served from the cache.
+        """
+        p = prepare_chain(arrays, check).dims
+        s, m = self.order_dims(p, engine, auto_threshold)
+        return (s, m) if return_costs else s
+
+    def order_dims(self, p, engine='loop', auto_threshold=HU_SHING_THRESHOLD):
+        """
+        Return the cached `(s, m)` for the dimension sequence `p`, as
+        read-only views.
+        """
+        # The resolved engine, not the threshold, decides the plan
+        if engine == 'auto':
+            long_chain = len(p) - 1 > auto_threshold
+            engine = 'hu_shing' if long_chain else 'vectorized'
+        key = (tuple(int(d) for d in p), engine)
+
+        with self._lock:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self.hits += 1
+                # Python 2 has no move_to_end, so re-insert instead
+                del self._plans[key]
+                self._plans[key] = plan
+                return _views(plan)
+            self.misses += 1
+
+        s, m = _chain_order(list(key[0]), engine, auto_threshold)
+        s.setflags(write=False)
+        m.setflags(write=False)
+
+        with self._lock:
+            # Another thread may have planned the same chain meanwhile
+            self._plans.pop(key, None)
+            self._plans[key] = (s, m)
+            while len(self._plans) > self.maxsize:
+                self._plans.popitem(last=False)
+                self.evictions += 1
+
+        return _views((s, m))
+
+    def clear(self):
+        """
+        Drop every cached plan and reset the counters.
+        """
+        with self._lock:
+            self._plans.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """
+        Return the hit, miss and eviction counters as a `CacheInfo`.
+        """
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.maxsize, len(self._plans))
+
+    def __len__(self):
+        return len(self._plans)
+
+def _views(plan):
+    # A view of a read-only array can never be made writeable, unlike the
+    # array owning the data, which the cache keeps private
+    s, m = plan
+    return s.view(), m.view()
+
+# Shared by `cached_multi_dot_matrix_chain_order`
+default_cache = ChainOrderCache()
+
+def cached_multi_dot_matrix_chain_order(arrays, return_costs=False,
+                                        engine='loop',
+                                        auto_threshold=HU_SHING_THRESHOLD,
+                                        check=True):
+    """
+    `multi_dot_matrix_chain_order` backed by the module-wide `default_cache`.
+    The returned arrays are read-only.
+    """
+    return default_cache.order(arrays, return_costs, engine, auto_threshold,
+                               check)
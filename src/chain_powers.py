@@ -0,0 +1,53 @@
+import hashlib
+
+from numpy.core import (
+    asarray, asanyarray, intp
+)
+
+from src.power_strategies import binary_multiplies
+
+def repeated_factor_runs(arrays, key='identity'):
+    """
+    Find runs of two or more consecutive identical factors in a chain, such
+    as the B's of A B B B C, which `matrix_power` computes in about log2(k)
+    products instead of k - 1.
+
+    Factors are identical if they are the same object (`key='identity'`,
+    O(1) per factor) or have the same shape, dtype and contents
+    (`key='content'`, one hash of every factor).
+
+    Returns an intp array holding, per factor, the index of the first
+    factor of its run, or -1 outside of runs; None if there is no run.
+    """
+    if key == 'identity':
+        same = [arrays[t] is arrays[t - 1] for t in range(1, len(arrays))]
+    elif key == 'content':
+        keys = [_content_key(a) for a in arrays]
+        same = [keys[t] == keys[t - 1] for t in range(1, len(keys))]
+    else:
+        raise ValueError("key must be 'identity' or 'content', not %r"
+                         % (key,))
+    if not any(same):
+        return None
+
+    run_id = [-1] * len(arrays)
+    for t, repeated in enumerate(same, 1):
+        if repeated:
+            run_id[t] = run_id[t - 1] = (run_id[t - 1] if run_id[t - 1] >= 0
+                                         else t - 1)
+    return asarray(run_id, dtype=intp)
+
+def power_cost(k, size, cost_model):
+    """
+    Cost of computing the k-th power of a (size, size) factor with the
+    binary squaring ladder, in the units of `cost_model`. `size` may be an
+    array.
+    """
+    return binary_multiplies(k) * cost_model.split_cost(size, size, size)
+
+def _content_key(a):
+    a = asanyarray(a)
+    if a.dtype == object:
+        return (a.shape, a.dtype.str, repr(a.tolist()))
+    return (a.shape, a.dtype.str,
+            hashlib.sha1(a.tobytes()).hexdigest())
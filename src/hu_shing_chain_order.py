@@ -0,0 +1,96 @@
+from numpy.core import zeros, double, intp
+
+from src.packed_triangle import SparseTriangle, split_dtype
+
+def hu_shing_chain_order(p, return_costs=False, packed=False,
+                         cost_dtype=double):
+    """
+    Return a split table for the chain with dimensions `p`, planned by
+    polygon partitioning instead of the O(n^3) dynamic program.
+    The implementation follows the heuristic of Hu and Shing, "An O(n)
+    algorithm to find a near-optimum partition of a convex polygon",
+    J. Algorithms 2 (1981). A chain of `n` matrices is a polygon with `n + 1`
+    vertices weighted by `p`; every triangle (a, c, b) of a partition is one
+    multiplication costing p[a]*p[c]*p[b].
+
+    Starting from the lightest vertex V1, a stack sweep cuts off every vertex
+    Vm lying between Vi and Vk for which
+        1/p[i] + 1/p[k] > 1/p[V1] + 1/p[m]
+    i.e. whenever the arc Vi-Vk is cheaper than joining Vm to V1, and fans
+    whatever is left from V1. Hu and Shing bound its cost within about 15.5%
+    of the optimum. The sweep, recording the n - 1 splits and summing their
+    costs are each O(n) in time and memory.
+
+    `s` has the same layout as `multi_dot_matrix_chain_order`: s[i, j] is the
+    k at which A_i..A_j is split. Only the cells of the split tree rooted
+    at s[0, n-1] are filled, which is all `_multi_dot()` ever reads; the
+    same holds for the cost matrix returned when `return_costs` is `True`.
+    With `packed` both are `SparseTriangle` tables storing just those
+    n - 1 cells instead of n**2, `s` of the narrowest dtype. The cost
+    matrix has dtype `cost_dtype`.
+    """
+    p = [int(d) for d in p]
+    n = len(p) - 1
+    splits = dict(((a, b - 1), c - 1) for a, c, b in _partition(p))
+    costs = {}
+
+    # Post-order walk of the split tree, so both sub-costs of a cell are
+    # summed before it; an explicit stack keeps long chains off the
+    # recursion limit
+    stack = [(0, n - 1, False)]
+    while stack:
+        i, j, expanded = stack.pop()
+        if i == j:
+            continue
+        k = splits[i, j]
+        if expanded:
+            costs[i, j] = (costs.get((i, k), 0) + costs.get((k + 1, j), 0)
+                           + p[i]*p[k+1]*p[j+1])
+        else:
+            stack.append((i, j, True))
+            stack.append((k + 1, j, False))
+            stack.append((i, k, False))
+
+    if packed:
+        s = SparseTriangle.from_dict(splits, n, split_dtype(n))
+        m = SparseTriangle.from_dict(costs, n, cost_dtype)
+    else:
+        s = _dense(splits, n, intp)
+        m = _dense(costs, n, cost_dtype)
+    return (s, m) if return_costs else s
+
+def _dense(entries, n, dtype):
+    table = zeros((n, n), dtype=dtype)
+    for cell, value in entries.items():
+        table[cell] = value
+    return table
+
+def _partition(p):
+    """
+    Triangulate the polygon with vertex weights `p`, returning each triangle
+    as a sorted vertex triple (a, c, b).
+    """
+    count = len(p)
+    if count < 3:
+        return []
+
+    first = min(range(count), key=p.__getitem__)
+    w1 = p[first]
+    order = [(first + t) % count for t in range(count)]
+
+    triangles = []
+    stack = order[:2]
+    for c in order[2:]:
+        while len(stack) >= 2:
+            i, v = stack[-2], stack[-1]
+            # 1/p[i] + 1/p[c] > 1/w1 + 1/p[v], multiplied out to stay in ints
+            if p[i]*p[c]*(p[v] + w1) >= w1*p[v]*(p[i] + p[c]):
+                break
+            triangles.append(tuple(sorted((i, v, c))))
+            stack.pop()
+        stack.append(c)
+
+    for t in range(1, len(stack) - 1):
+        triangles.append(tuple(sorted((stack[0], stack[t], stack[t+1]))))
+
+    return triangles
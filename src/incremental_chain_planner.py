@@ -0,0 +1,153 @@
+from numpy.core import (
+    zeros, empty, double, Inf, intp, asarray, arange
+)
+
+from src.chain_cost_models import FlopsCostModel
+from src.validation import LinAlgError
+
+class IncrementalChainPlanner(object):
+    """
+    Optimal order of a matrix chain that grows one factor at a time.
+
+    Appending A_j leaves every entry m[i, k], k < j, of the DP tables valid,
+    so only the new column j is filled, bottom-up from i = j - 1 to 0. Each
+    cell looks at its j - i splits in one NumPy operation, making an append
+    O(n**2) instead of the O(n**3) of replanning the whole chain. The tables
+    grow by doubling, and `s` and `m` always hold the upper triangle
+    `multi_dot_matrix_chain_order` would return for the current chain,
+    including how ties are broken.
+
+    As in `prepare_chain`, a 1-D first factor is a row vector; a 1-D factor
+    appended later is a column vector and ends the chain.
+
+    Parameters
+    ----------
+    cost_model : FlopsCostModel, optional
+        Cost of each split, see `chain_cost_models`. Counts scalar
+        multiplications by default.
+    capacity : int, optional
+        Number of factors the tables are allocated for initially.
+
+    Examples
+    --------
+    >>> planner = IncrementalChainPlanner()
+    >>> planner.append((10, 100))
+    0.0
+    >>> planner.append((100, 5))
+    5000.0
+    >>> planner.append((5, 50))
+    7500.0
+    >>> planner.s[0, 2]
+    1
+    """
+
+    def __init__(self, cost_model=None, capacity=16):
+        self.cost_model = cost_model or FlopsCostModel()
+        self._p = []
+        capacity = max(capacity, 1)
+        self._m = zeros((capacity, capacity), dtype=double)
+        self._s = empty((capacity, capacity), dtype=intp)
+        self._total = 0.0
+        self._closed = False
+
+    def append(self, a):
+        """
+        Append the factor `a`, an array or its shape tuple, to the end of
+        the chain and return the cost of the new optimal order, Inf if no
+        order keeps every intermediate within the model's budget.
+
+        Raises
+        ------
+        LinAlgError
+            If `a` is not two-dimensional or does not chain with the
+            previous factor.
+        ValueError
+            If the chain already ends with a column vector.
+        """
+        shape = tuple(a.shape) if hasattr(a, 'shape') else tuple(a)
+        if self._closed:
+            raise ValueError("the chain ends with a vector and cannot grow")
+        vector_end = len(shape) == 1 and bool(self._p)
+        if len(shape) == 1:
+            shape = shape + (1,) if vector_end else (1,) + shape
+        if len(shape) != 2:
+            raise LinAlgError('%d-dimensional array given. Array must be '
+                              'two-dimensional' % len(shape))
+        if not self._p:
+            self._p.append(shape[0])
+        elif shape[0] != self._p[-1]:
+            raise LinAlgError('shape %s is not aligned with the %d columns '
+                              'of the chain' % (shape, self._p[-1]))
+        self._p.append(shape[1])
+        self._closed = vector_end
+
+        j = len(self._p) - 2
+        if j == self._m.shape[0]:
+            self._grow()
+        self._fill_column(j)
+        return self._total
+
+    def _fill_column(self, j):
+        m, s, p = self._m, self._s, asarray(self._p, dtype=double)
+        cost_model = self.cost_model
+        m[j, j] = 0.0
+        self._total = 0.0
+        for i in range(j - 1, -1, -1):
+            k = arange(i, j)
+            q = m[i, i:j] + m[k+1, j] + cost_model.split_cost(p[i], p[k+1],
+                                                              p[j+1])
+            best = q.argmin()
+            s[i, j] = i + best
+            m[i, j] = q[best]
+            if i == 0:
+                self._total = q[best]
+            # Only the product of the whole chain may exceed the model's
+            # limits, and once another factor is appended it no longer is
+            if not cost_model.fits(p[i], p[j+1]):
+                m[i, j] = Inf
+
+    def _grow(self):
+        n = self._m.shape[0]
+        m = zeros((2 * n, 2 * n), dtype=double)
+        s = empty((2 * n, 2 * n), dtype=intp)
+        m[:n, :n] = self._m
+        s[:n, :n] = self._s
+        self._m, self._s = m, s
+
+    @property
+    def dims(self):
+        """
+        The dimension sequence p of the chain, A_i being (p[i], p[i+1]).
+        """
+        return tuple(self._p)
+
+    @property
+    def cost(self):
+        """
+        Cost of the optimal order of the current chain.
+        """
+        return self._total
+
+    @property
+    def s(self):
+        """
+        The (n, n) split table of the current chain, read-only.
+        """
+        n = len(self)
+        s = self._s[:n, :n]
+        s.setflags(write=False)
+        return s
+
+    @property
+    def m(self):
+        """
+        The (n, n) cost table of the current chain, as a copy.
+        """
+        n = len(self)
+        m = self._m[:n, :n].copy()
+        if n:
+            m[0, n - 1] = self._total
+        return m
+
+    def __len__(self):
+        return max(len(self._p) - 1, 0)
@@ -0,0 +1,132 @@
+import time
+from collections import namedtuple
+from threading import Lock
+
+# Highest resolution clock available, time.time on Python 2
+_clock = getattr(time, 'perf_counter', time.time)
+
+class MultiplyEvent(namedtuple('MultiplyEvent', [
+        'source', 'left_shape', 'right_shape', 'dtype', 'flops', 'nbytes',
+        'allocated', 'seconds'])):
+    """
+    One matrix product issued by an instrumented function.
+
+    source : name of the function issuing it, e.g. 'matrix_power'
+    left_shape, right_shape : shapes of the operands
+    dtype : name of the product's dtype
+    flops : 2*M*K*N per (M, K) @ (K, N) product, times the stack size
+    nbytes : size of the product
+    allocated : whether the product was allocated, False when the
+        function wrote it into the existing buffer passed as ``out=``
+    seconds : wall time of the multiplication
+    """
+    __slots__ = ()
+
+# Callbacks receiving every MultiplyEvent; empty means disabled
+_hooks = []
+_lock = Lock()
+
+def add_hook(callback):
+    """
+    Call ``callback(event)`` with a `MultiplyEvent` for every product
+    instrumented functions issue from now on, possibly from worker
+    threads. Functions only pay for instrumentation while a hook is
+    registered.
+    """
+    with _lock:
+        _hooks.append(callback)
+
+def remove_hook(callback):
+    """
+    Stop calling a callback registered with `add_hook`.
+    """
+    with _lock:
+        _hooks.remove(callback)
+
+def instrument(fmatmul, source):
+    """
+    Return `fmatmul` itself while no hook is registered, so disabled
+    instrumentation costs nothing per product, or a wrapper reporting
+    every call to the hooks otherwise. `fmatmul` is called as
+    ``fmatmul(x, y)``, or ``fmatmul(x, y, out=out)`` when `out` is given.
+
+    A product is reported as allocated unless `fmatmul` returned `out`
+    itself. Kernels that cannot write a product into `out` directly
+    therefore return their own array and leave the copy to the caller.
+    """
+    if not _hooks:
+        return fmatmul
+
+    def instrumented(x, y, out=None):
+        start = _clock()
+        if out is None:
+            result = fmatmul(x, y)
+        else:
+            result = fmatmul(x, y, out=out)
+        seconds = _clock() - start
+        _emit(MultiplyEvent(source, tuple(x.shape), tuple(y.shape),
+                            str(result.dtype), _flops(x, result),
+                            _nbytes(result), result is not out, seconds))
+        return result
+    return instrumented
+
+def _emit(event):
+    for hook in tuple(_hooks):
+        hook(event)
+
+def _flops(x, result):
+    size = 1
+    for d in result.shape:
+        size *= int(d)
+    return 2 * size * int(x.shape[-1])
+
+def _nbytes(a):
+    nbytes = getattr(a, 'nbytes', None)
+    if nbytes is not None:
+        return int(nbytes)
+    # scipy.sparse matrices store their entries in several arrays
+    return sum(int(getattr(a, name).nbytes)
+               for name in ('data', 'indices', 'indptr', 'row', 'col')
+               if hasattr(a, name))
+
+class recording(object):
+    """
+    Context manager collecting every product issued inside the block.
+
+    Examples
+    --------
+    >>> with recording() as rec:
+    ...     _ = matrix_power(np.ones((4, 4)), 8)
+    >>> rec.totals()['multiplies']
+    3
+    """
+
+    def __init__(self):
+        self.events = []
+
+    def __enter__(self):
+        add_hook(self.events.append)
+        return self
+
+    def __exit__(self, *exc_info):
+        remove_hook(self.events.append)
+        return False
+
+    def as_dicts(self):
+        """
+        Return the events as plain dicts, ready for json.dump.
+        """
+        return [dict(event._asdict()) for event in self.events]
+
+    def totals(self):
+        """
+        Aggregate the events: number of products, FLOPs, allocated bytes
+        and seconds.
+        """
+        return {
+            'multiplies': len(self.events),
+            'flops': sum(e.flops for e in self.events),
+            'allocated_bytes': sum(e.nbytes for e in self.events
+                                   if e.allocated),
+            'seconds': sum(e.seconds for e in self.events),
+        }
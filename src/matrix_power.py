@@ -1,36 +1,32 @@
 import operator
 
-from numpy.core import (asanyarray, matmul, dot, empty_like)
+from numpy.core import (asarray, empty, empty_like, integer, inexact,
+                        result_type, ndarray)
+from numpy.core.numerictypes import issubdtype
 from numpy.lib.twodim_base import eye
 from numpy import linalg
 
-# Error object
-class LinAlgError(Exception):
-    """
-    Generic Python-exception-derived object raised by linalg functions.
-    General purpose exception class, derived from Python's exception.Exception
-    class, programmatically raised in linalg functions when a Linear
-    Algebra-related condition would prevent further correct execution of the
-    function.
-    Parameters
-    ----------
-    None
-    Examples
-    --------
-    >>> from numpy import linalg as LA
-    >>> LA.inv(np.zeros((2,2)))
-    Traceback (most recent call last):
-      File "<stdin>", line 1, in <module>
-      File "...linalg.py", line 350,
-        in inv return wrap(solve(a, identity(a.shape[0], dtype=a.dtype)))
-      File "...linalg.py", line 249,
-        in solve
-        raise LinAlgError('Singular matrix')
-    numpy.linalg.LinAlgError: Singular matrix
-    """
-    pass
+from src.instrumentation import instrument
+from src.matrix_power_eig import EigenPowerDecomposition
+from src.mixed_precision import (
+    DEFAULT_MIXED_TOL, SINGLE, ErrorTrackingMatmul
+)
+from src.matrix_structure import (
+    classify, diagonal_power, permutation_power, structured_matmul
+)
+from src.modular_matmul import modular_matmul, reduce_modulo
+from src.sparse_matmul import (
+    DEFAULT_DENSITY_THRESHOLD, DensityAdaptiveMatmul, issparse, sparse_identity
+)
+from src.power_strategies import (
+    STRATEGIES, MAX_CHAIN_EXPONENT, binary_power_buffered
+)
+from src.validation import LinAlgError, unpack_power_operand
 
-def matrix_power(a, n):
+def matrix_power(a, n, strategy='binary', return_info=False, out=None,
+                 method='squaring', decomposition=None, modulus=None,
+                 density_threshold=None, detect_structure=False, check=True,
+                 precision='full', tol=None):
     """
     Raise a square matrix to the (integer) power `n`.
 
@@ -39,15 +35,87 @@ def matrix_power(a, n):
     of the same shape as M is returned. If ``n < 0``, the inverse
     is computed and then raised to the ``abs(n)``.
 
-    .. note:: Stacks of object matrices are not currently supported.
+    .. note:: Stacks of object matrices are not currently supported,
+              unless a `modulus` is given.
+
+    While a hook is registered with `instrumentation.add_hook` (or inside
+    ``with instrumentation.recording()``), every matrix product is
+    reported with its shapes, FLOPs, bytes and wall time.
 
     Parameters
     ----------
-    a : (..., M, M) array_like
-        Matrix to be "powered."
+    a : (..., M, M) array_like, (M, M) scipy.sparse matrix or PowerOperand
+        Matrix to be "powered." A `PowerOperand` from
+        `validation.prepare_power_operand` is used as is, without repeating
+        the validation.
     n : int
         The exponent can be any integer or long integer, positive,
         negative, or zero.
+    strategy : {'binary', 'window', 'chain'}, optional
+        How the squarings and multiplications are arranged, see
+        `power_strategies`. 'binary' (default) is right-to-left binary
+        exponentiation, 'window' is sliding-window exponentiation with an
+        automatic window size, and 'chain' follows a shortest addition
+        chain; above MAX_CHAIN_EXPONENT 'chain' falls back to 'window'.
+    return_info : bool, optional
+        If True, also return a dict describing the computation, with the
+        'method' and 'strategy' actually used, the detected 'structure'
+        (None if not classified), the number of 'matmuls' performed, the
+        'precision' used and, after precision='mixed', the relative
+        'error_estimate' of the result (None otherwise).
+        For sparse input, 'representations' lists the ('sparse' or
+        'dense', density) of every product in order.
+    out : ndarray, optional
+        Array the result is written into; it must have the shape and dtype
+        of the result. With the 'binary' strategy the whole computation
+        runs in `out` plus two scratch arrays of the same shape, so no other
+        temporaries are allocated however large `n` is.
+    method : {'squaring', 'eig'}, optional
+        'eig' computes ``V diag(w**n) V**-1`` from an eigendecomposition of
+        a float or complex `a`, which is much cheaper for large exponents.
+        The relative error is about ``cond(V) * |n| * eps``; when the
+        eigenvectors are worse conditioned than `DEFAULT_MAX_COND` (e.g. a
+        defective matrix), for integer input, for ``|n| > 2**62`` or for
+        negative powers of a singular matrix, it falls back to repeated
+        squaring.
+    decomposition : EigenPowerDecomposition, optional
+        A decomposition of `a` to reuse with method='eig', so later exponents
+        of the same matrix skip the O(M**3) factorization.
+    modulus : int, optional
+        Compute ``a**n % modulus`` for an integer (or object-integer) `a`.
+        The data is reduced into int64 once and every product is reduced
+        again, split into digit products where needed so int64 never
+        overflows; this avoids object arithmetic and supports stacks.
+        Any modulus below 2**63 is accepted. Requires ``n >= 0``; the
+        result has dtype int64.
+    density_threshold : float, optional
+        For scipy.sparse input: products stay sparse (CSR) while their
+        fraction of nonzeros is at most this, `DEFAULT_DENSITY_THRESHOLD` by
+        default, and become dense arrays once fill-in exceeds it. The input
+        itself is densified if it is already denser.
+    detect_structure : bool, optional
+        Classify `a` with `matrix_structure.classify` (a few scans that
+        stop at the first structure ruled out) and use a specialized
+        kernel: elementwise powers for diagonal matrices, index composition
+        for permutation matrices, and BLAS trmm / syrk products (with
+        scipy, for 2-D float or complex input) for triangular and symmetric
+        ones. Off by default, as the scan costs more than it saves for
+        small matrices.
+    check : bool, optional
+        Validate the rank, squareness and dtype of `a`. Pass False only for
+        inputs known to be valid.
+    precision : {'full', 'mixed'}, optional
+        'mixed' runs the products of a float64 (complex128) `a` in float32
+        (complex64), for about twice the BLAS throughput, while a norm-based
+        estimate of the error of every product is kept, see
+        `mixed_precision.ErrorTrackingMatmul`. Once a product exceeds
+        relative error `tol` the remaining products run in double; if the
+        result still exceeds `tol` it is recomputed in double throughout.
+        The result has the dtype of `a`. Other input, structured kernels
+        and method='eig' use full precision.
+    tol : float, optional
+        Relative error estimate accepted with precision='mixed',
+        `DEFAULT_MIXED_TOL` by default.
 
     Returns
     -------
@@ -55,13 +123,21 @@ def matrix_power(a, n):
         The return value is the same shape and type as `M`;
         if the exponent is positive or zero then the type of the
         elements is the same as those of `M`. If the exponent is
-        negative the elements are floating-point.
+        negative the elements are floating-point. For sparse input it is
+        a CSR matrix while sparse, otherwise a dense ndarray.
+    info : dict
+        Only returned if `return_info` is True.
 
     Raises
     ------
     LinAlgError
         For matrices that are not square or that (for negative powers) cannot
         be inverted numerically.
+    ValueError
+        For an unknown `strategy` or `method`, a `decomposition` without
+        method='eig', a `modulus` combined with a negative `n` or
+        method='eig', or sparse input combined with method='eig',
+        `modulus` or `out`.
 
     Examples
     --------
@@ -94,64 +170,297 @@ def matrix_power(a, n):
            [ 0.,  0.,  0., -1.]])
 
     """
-    a = asanyarray(a)
-    _assertRankAtLeast2(a)
-    _assertNdSquareness(a)
+    a, matmul_for_a, sparse = unpack_power_operand(a, check)
 
     try:
         n = operator.index(n)
     except TypeError:
         raise TypeError("exponent must be an integer")
 
-    # Fall back on dot for object arrays. Object arrays are not supported by
-    # the current implementation of matmul using einsum
-    if a.dtype != object:
-        fmatmul = matmul
-    elif a.ndim == 2:
-        fmatmul = dot
+    try:
+        power = STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError("unknown strategy %r, expected one of %s"
+                         % (strategy, sorted(STRATEGIES)))
+
+    if method not in ('squaring', 'eig'):
+        raise ValueError("unknown method %r, expected 'squaring' or 'eig'"
+                         % (method,))
+    if decomposition is not None and method != 'eig':
+        raise ValueError("decomposition is only used with method='eig'")
+
+    if precision not in ('full', 'mixed'):
+        raise ValueError("unknown precision %r, expected 'full' or 'mixed'"
+                         % (precision,))
+    mixed = (precision == 'mixed' and type(a) is ndarray
+             and a.dtype.type in SINGLE and modulus is None)
+    precision = 'full'
+    error_estimate = None
+
+    if sparse:
+        if method != 'squaring' or modulus is not None or out is not None:
+            raise ValueError("sparse matrices only support method='squaring' "
+                             "without modulus or out")
+        multiplier = DensityAdaptiveMatmul(
+            DEFAULT_DENSITY_THRESHOLD if density_threshold is None
+            else density_threshold)
+        a = multiplier.prepare(a)
+        fmatmul = _CountingMatmul(multiplier)
+    elif modulus is None:
+        if matmul_for_a is None:
+            raise NotImplementedError(
+                "matrix_power not supported for stacks of object arrays")
+        fmatmul = _CountingMatmul(matmul_for_a)
     else:
-        raise NotImplementedError(
-            "matrix_power not supported for stacks of object arrays")
+        if n < 0:
+            raise ValueError("negative powers are not supported with a "
+                             "modulus")
+        if method == 'eig':
+            raise ValueError("method='eig' cannot be used with a modulus")
+        try:
+            modulus = operator.index(modulus)
+        except TypeError:
+            raise TypeError("modulus must be an integer")
+        a = reduce_modulo(a, modulus)
+        fmatmul = _CountingMatmul(modular_matmul(modulus, a.shape[-1]))
+
+    result = structure = None
+    if n == 0 and issparse(a):
+        result = sparse_identity(a)
 
-    if n == 0:
-        a = empty_like(a)
+    elif n == 0:
+        a = empty_like(a) if out is None else out
         a[...] = eye(a.shape[-2], dtype=a.dtype)
-        return a
+        if modulus is not None:
+            a %= modulus
+        result = a
 
-    elif n < 0:
-        a = linalg.inv(a)
-        n = abs(n)
+    elif method == 'eig':
+        if decomposition is None and issubdtype(a.dtype, inexact):
+            decomposition = EigenPowerDecomposition(a)
+        elif decomposition is not None and decomposition.shape != a.shape:
+            raise ValueError("decomposition is for a matrix of shape %s, "
+                             "not %s" % (decomposition.shape, a.shape))
+        if decomposition is not None:
+            result = decomposition.power(n)
+        if result is None:
+            # integer input, ill-conditioned eigenvectors or singular `a`
+            method = 'squaring'
+        else:
+            strategy = None
+            fmatmul.count += 1  # V diag(w**n) times V**-1
+            if out is not None:
+                out[...] = result
+                result = out
 
-    # short-cuts.
-    if n == 1:
-        return a
+    if result is None:
+        if n < 0:
+            # the inverse of a sparse matrix is dense in general
+            a = linalg.inv(a.toarray() if issparse(a) else a)
+            n = abs(n)
 
-    elif n == 2:
-        return fmatmul(a, a)
+        if (detect_structure and n > 1 and type(a) is ndarray
+                and modulus is None):
+            structure = classify(a)
 
-    elif n == 3:
-        return fmatmul(fmatmul(a, a), a)
+        if structure in ('diagonal', 'permutation'):
+            strategy = None
+            if structure == 'diagonal':
+                result = diagonal_power(a, n)
+            else:
+                result = permutation_power(a, n)
+            if out is not None:
+                out[...] = result
+                result = out
 
-    # Use binary decomposition to reduce the number of matrix multiplications.
-    # Here, we iterate over the bits of n, from LSB to MSB, raise `a` to
-    # increasing powers of 2, and multiply into the result as needed.
-    z = result = None
-    while n > 0:
-        z = a if z is None else fmatmul(z, z)
-        n, bit = divmod(n, 2)
-        if bit:
-            result = z if result is None else fmatmul(result, z)
+        else:
+            if structure is not None and not mixed:
+                structured = structured_matmul(structure, a)
+                if structured is not None:
+                    fmatmul.use(structured)
 
+            # The addition-chain table only covers small exponents
+            if strategy == 'chain' and n > MAX_CHAIN_EXPONENT:
+                strategy = 'window'
+                power = STRATEGIES[strategy]
+
+            if mixed:
+                result, error_estimate, precision = _mixed_power(
+                    a, n, power, fmatmul,
+                    DEFAULT_MIXED_TOL if tol is None else tol)
+                if out is not None:
+                    out[...] = result
+                    result = out
+
+            # Plain numeric arrays are powered in three fixed buffers; matrix
+            # subclasses and object arrays cannot be relied on to honour out=.
+            # Up to n = 3 every product is a fresh array anyway, and matmul
+            # is cheaper without out= on small matrices.
+            elif (strategy == 'binary' and (n > 3 or out is not None)
+                    and not sparse and type(a) is ndarray
+                    and a.dtype.kind != 'O'):
+                result = binary_power_buffered(a, n, fmatmul, out)
+            else:
+                result = power(a, n, fmatmul)
+                if out is not None:
+                    out[...] = result
+                    result = out
+
+    if return_info:
+        info = {'method': method, 'strategy': strategy,
+                'structure': structure, 'matmuls': fmatmul.count,
+                'precision': precision,
+                'error_estimate': error_estimate}
+        if sparse:
+            info['representations'] = multiplier.representations
+        return result, info
     return result
 
-def _assertRankAtLeast2(*arrays):
-    for a in arrays:
-        if a.ndim < 2:
-            raise LinAlgError('%d-dimensional array given. Array must be '
-                    'at least two-dimensional' % a.ndim)
-
-def _assertNdSquareness(*arrays):
-    for a in arrays:
-        m, n = a.shape[-2:]
-        if m != n:
-            raise LinAlgError('Last 2 dimensions of the array must be square')
+def _mixed_power(a, n, power, fmatmul, tol):
+    """
+    `power` of `a` in single precision as far as `tol` allows, returning
+    the result, its relative error estimate and the precision used.
+    """
+    tracker = ErrorTrackingMatmul(a, tol)
+    fmatmul.use(tracker)
+    result = power(tracker.start(), n, fmatmul)
+    precision = 'mixed'
+    if tracker.error_estimate(result) > tol:
+        tracker = ErrorTrackingMatmul(a, tol, single=False)
+        fmatmul.use(tracker)
+        result = power(tracker.start(), n, fmatmul)
+        precision = 'full'
+    return (result.astype(a.dtype, copy=False),
+            tracker.error_estimate(result), precision)
+
+class _CountingMatmul(object):
+    """
+    Wrap a multiplication function and count how often it is called. A
+    function returning another array than the `out` it was given, as the
+    modular and BLAS kernels may, has its product copied into `out`.
+    """
+    __slots__ = ('fmatmul', 'count')
+
+    def __init__(self, fmatmul):
+        self.use(fmatmul)
+        self.count = 0
+
+    def use(self, fmatmul):
+        """
+        Multiply with `fmatmul` from now on, reported to the
+        instrumentation hooks if any are registered.
+        """
+        self.fmatmul = instrument(fmatmul, 'matrix_power')
+
+    def __call__(self, x, y, out=None):
+        self.count += 1
+        if out is None:
+            return self.fmatmul(x, y)
+        result = self.fmatmul(x, y, out=out)
+        if result is not out:
+            out[...] = result
+        return out
+
+def matrix_power_batch(a, exponents):
+    """
+    Raise a square matrix to each of the (integer) powers in `exponents`.
+
+    Equivalent to stacking ``matrix_power(a, n)`` for every `n`, but the
+    squarings ``a, a**2, a**4, ...`` are computed once and shared: each power
+    only multiplies together the squarings selected by its bits. For K
+    exponents up to N this takes log2(N) squarings instead of K*log2(N).
+    If any exponent is negative the inverse is computed once and gets its
+    own ladder.
+
+    Parameters
+    ----------
+    a : (..., M, M) array_like
+        Matrix to be "powered."
+    exponents : (K,) array_like of int
+        The exponents, any integers. A multi-dimensional array of
+        exponents is also accepted.
+
+    Returns
+    -------
+    a**exponents : (K, ..., M, M) ndarray
+        ``result[k]`` is ``matrix_power(a, exponents[k])``. The elements
+        are floating-point if any exponent is negative.
+
+    Raises
+    ------
+    LinAlgError
+        For matrices that are not square or that (for negative powers) cannot
+        be inverted numerically.
+
+    Examples
+    --------
+    >>> p = np.array([[0.9, 0.1], [0.5, 0.5]]) # Markov transition matrix
+    >>> matrix_power_batch(p, [1, 2, 8]).shape
+    (3, 2, 2)
+    """
+    a, fmatmul, _ = unpack_power_operand(a)
+    if fmatmul is None:
+        raise NotImplementedError(
+            "matrix_power not supported for stacks of object arrays")
+
+    exponents = asarray(exponents)
+    if exponents.dtype != object and not issubdtype(exponents.dtype, integer):
+        raise TypeError("exponents must be integers")
+    ns = [operator.index(n) for n in exponents.ravel()]
+
+    fmatmul = instrument(fmatmul, 'matrix_power_batch')
+    ladders = {1: _PowerLadder(a, fmatmul)}
+    if any(n < 0 for n in ns):
+        ladders[-1] = _PowerLadder(linalg.inv(a), fmatmul)
+    dtype = result_type(*[ladder.base for ladder in ladders.values()])
+
+    result = empty((len(ns),) + a.shape, dtype=dtype)
+    for index, n in enumerate(ns):
+        if n == 0:
+            result[index] = eye(a.shape[-2], dtype=dtype)
+        else:
+            result[index] = ladders[1 if n > 0 else -1].power(abs(n))
+
+    return result.reshape(exponents.shape + a.shape)
+
+class _PowerLadder(object):
+    """
+    The squarings ``base**(2**b)`` of one matrix, computed on first use.
+    A missing squaring is squared up from the nearest lower one still
+    stored; `MatrixPowerCache` overrides `squaring` and `store` to count,
+    protect and evict them.
+    """
+
+    def __init__(self, base, fmatmul):
+        self.base = base
+        self.fmatmul = fmatmul
+        self.squarings = {}
+
+    def power(self, n):
+        result = None
+        bit = 0
+        while n > 0:
+            n, set_bit = divmod(n, 2)
+            if set_bit:
+                z = self.squaring(bit)
+                result = z if result is None else self.fmatmul(result, z)
+            bit += 1
+        return result
+
+    def squaring(self, bit):
+        if bit == 0:
+            return self.base
+        z = self.squarings.get(bit)
+        if z is not None:
+            return z
+        lower = bit - 1
+        while lower > 0 and lower not in self.squarings:
+            lower -= 1
+        z = self.squaring(lower)
+        for b in range(lower + 1, bit + 1):
+            z = self.fmatmul(z, z)
+            self.store(b, z)
+        return z
+
+    def store(self, bit, z):
+        self.squarings[bit] = z
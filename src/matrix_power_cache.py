@@ -0,0 +1,144 @@
+import hashlib
+import operator
+from collections import OrderedDict
+
+from numpy.core import empty_like
+from numpy.lib.twodim_base import eye
+from numpy import linalg
+
+from src.matrix_power import _PowerLadder
+from src.validation import prepare_power_operand
+
+class MatrixPowerCache(_PowerLadder):
+    """
+    Wrap a square matrix and keep its squarings ``a**(2**b)`` between calls,
+    so ``power(n)`` only pays for the multiplications combining the set
+    bits of `n`. For n >= 4 these are exactly the products `matrix_power`
+    performs with the default 'binary' strategy.
+
+    Squarings are computed lazily. At most `max_bytes` of them are kept; the
+    least recently used one is evicted first and recomputed from the
+    nearest lower squaring when needed again. The wrapped matrix itself is
+    never evicted and does not count towards the cap. Stored squarings are
+    read-only; a power that is one of them is returned as a view, so writing
+    to a result can never corrupt the cache.
+
+    The cached squarings are only valid while the wrapped matrix is
+    unchanged, which every call verifies according to `key`:
+
+    'content'
+        A hash of the matrix contents is recomputed and compared on every
+        call, O(M**2); any in-place change invalidates the cache.
+    'identity'
+        O(1): the matrix is copied once into a private read-only array, so
+        the cache powers `a` as it was at construction and later changes
+        to the caller's array are not seen. `self.a` is a view of the copy,
+        whose writes cannot be re-enabled.
+
+    Parameters
+    ----------
+    a : (..., M, M) array_like
+        Matrix to be "powered."
+    max_bytes : int, optional
+        Memory cap for the stored squarings, unbounded by default.
+    key : {'content', 'identity'}, optional
+        How changes to `a` are detected.
+
+    Examples
+    --------
+    >>> cache = MatrixPowerCache(np.array([[1, 1], [1, 0]]))
+    >>> cache.power(10)[0, 1]
+    55
+    >>> cache.power(12)[0, 1] # reuses a**4 and a**8
+    144
+    """
+
+    def __init__(self, a, max_bytes=None, key='content'):
+        a, fmatmul, _ = prepare_power_operand(a)
+        if fmatmul is None:
+            raise NotImplementedError(
+                "matrix_power not supported for stacks of object arrays")
+        if key not in ('content', 'identity'):
+            raise ValueError("key must be 'content' or 'identity', not %r"
+                             % (key,))
+        if key == 'identity':
+            a = a.copy()
+            a.setflags(write=False)
+            a = a.view()
+
+        _PowerLadder.__init__(self, a, fmatmul)
+        self.a = a
+        self.key = key
+        self.max_bytes = max_bytes
+        self.squarings = OrderedDict()
+        self._fingerprint = self._current_fingerprint()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def power(self, n):
+        """
+        Return ``a**n``, like ``matrix_power(a, n)``. Negative powers are
+        the inverse of the positive power.
+        """
+        try:
+            n = operator.index(n)
+        except TypeError:
+            raise TypeError("exponent must be an integer")
+        self._validate()
+        if n == 0:
+            result = empty_like(self.a)
+            result[...] = eye(self.a.shape[-2], dtype=self.a.dtype)
+            return result
+        elif n < 0:
+            return linalg.inv(self.power(-n))
+
+        result = _PowerLadder.power(self, n)
+        # Views of the read-only squarings stay read-only
+        return result if result.flags.writeable else result.view()
+
+    def clear(self):
+        """
+        Drop every stored squaring.
+        """
+        self.squarings.clear()
+
+    @property
+    def nbytes(self):
+        """
+        Bytes currently held by stored squarings.
+        """
+        return sum(z.nbytes for z in self.squarings.values())
+
+    def squaring(self, bit):
+        z = self.squarings.get(bit) if bit else None
+        if z is not None:
+            self.hits += 1
+            del self.squarings[bit]
+            self.squarings[bit] = z
+            return z
+        if bit:
+            self.misses += 1
+        return _PowerLadder.squaring(self, bit)
+
+    def store(self, bit, z):
+        z.setflags(write=False)
+        self.squarings[bit] = z
+        if self.max_bytes is None:
+            return
+        while self.squarings and self.nbytes > self.max_bytes:
+            self.squarings.popitem(last=False)
+            self.evictions += 1
+
+    def _validate(self):
+        if self._current_fingerprint() != self._fingerprint:
+            self.squarings.clear()
+            self.invalidations += 1
+            self._fingerprint = self._current_fingerprint()
+
+    def _current_fingerprint(self):
+        a = self.a
+        if self.key == 'identity':
+            # The private copy cannot change
+            return None
+        digest = hashlib.sha1(a.tobytes()) if a.dtype != object else None
+        return (a.shape, a.dtype.str,
+                digest.hexdigest() if digest else repr(a.tolist()))
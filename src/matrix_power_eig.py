@@ -0,0 +1,73 @@
+from numpy.core import (
+    asanyarray, matmul, newaxis, inexact, complexfloating, all as _all
+)
+from numpy.core.numerictypes import issubdtype
+from numpy import linalg
+
+# Eigenvector matrices worse conditioned than this are not trusted
+DEFAULT_MAX_COND = 1e6
+
+# NumPy raises complex eigenvalues to an integer power through a double,
+# which leaves the int64 range from just below 2**63; larger exponents are
+# left to repeated squaring
+MAX_EXPONENT = 2**62
+
+class EigenPowerDecomposition(object):
+    """
+    The eigendecomposition ``a = V diag(w) V**-1`` of a square float matrix,
+    kept so that any power ``a**n = V diag(w**n) V**-1`` costs O(M**2) for
+    the scaling plus one matrix product, instead of O(M**3 log n).
+
+    Build it once and pass it to ``matrix_power(a, n, method='eig',
+    decomposition=...)`` for every exponent of the same matrix.
+
+    Accuracy: the relative error of a power is about ``cond(V) * |n| * eps``
+    (eps being the machine epsilon of the dtype), because rounding in `V`
+    and `V**-1` is amplified by the conditioning of the eigenvectors and
+    rounding in `w` grows linearly with the exponent. The decomposition is
+    only marked `reliable` if ``cond(V) <= max_cond``; `matrix_power` falls
+    back to repeated squaring otherwise, e.g. for defective matrices.
+
+    Parameters
+    ----------
+    a : (..., M, M) array_like
+        Float or complex matrix to decompose.
+    max_cond : float
+        Largest condition number of `V` accepted, for every matrix of a
+        stack.
+
+    Attributes
+    ----------
+    reliable : bool
+        Whether powers may be computed from this decomposition.
+    cond : float or ndarray
+        Condition number of the eigenvector matrix (one per matrix).
+    """
+
+    def __init__(self, a, max_cond=DEFAULT_MAX_COND):
+        a = asanyarray(a)
+        if not issubdtype(a.dtype, inexact):
+            raise TypeError("eigendecomposition requires a float or complex "
+                            "matrix, got %s" % a.dtype)
+        self.dtype = a.dtype
+        self.shape = a.shape
+        self.w, self.v = linalg.eig(a)
+        self.cond = linalg.cond(self.v)
+        self.reliable = bool(_all(self.cond <= max_cond))
+        self.v_inv = linalg.inv(self.v) if self.reliable else None
+
+    def power(self, n):
+        """
+        Return ``a**n``, or None if this decomposition cannot provide it:
+        when it is not reliable, ``|n|`` exceeds `MAX_EXPONENT`, or `n` is
+        negative and `a` singular.
+        """
+        if not self.reliable or abs(n) > MAX_EXPONENT:
+            return None
+        if n < 0 and not _all(self.w != 0):
+            return None
+        result = matmul(self.v * (self.w ** n)[..., newaxis, :], self.v_inv)
+        # A real matrix has a real power; drop the rounding residue
+        if not issubdtype(self.dtype, complexfloating):
+            result = result.real
+        return result.astype(self.dtype, copy=False)
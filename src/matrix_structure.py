@@ -0,0 +1,154 @@
+from numpy.core import (
+    arange, empty, matmul, swapaxes, zeros_like, count_nonzero, newaxis,
+    float32, float64, complex64, complex128
+)
+from numpy.lib.shape_base import put_along_axis, take_along_axis
+from numpy.lib.twodim_base import tri, triu_indices
+
+# Structures with a specialized kernel
+STRUCTURES = ('diagonal', 'upper', 'lower', 'permutation', 'symmetric')
+
+# Element types the BLAS routines of scipy.linalg.blas accept
+_BLAS_TYPES = (float32, float64, complex64, complex128)
+
+def classify(a):
+    """
+    Return the structure shared by every matrix of the (..., M, M) array
+    `a`: 'diagonal', 'upper' or 'lower' (triangular), 'permutation',
+    'symmetric', or 'general'.
+
+    The checks run in the order of `STRUCTURES` and each one starts with
+    an O(M) test that is cheap when it fails: the entries next to the
+    diagonal before the whole triangles, the nonzeros of the first row
+    before the entries of a permutation, the first row and column before
+    the whole transpose. A general dense matrix is thus rejected after
+    O(M) work.
+    """
+    m = a.shape[-1]
+    if m == 1:
+        return 'diagonal'
+    # count_nonzero skips the ufunc machinery of .any() on small slices
+    below = (count_nonzero(a[..., 1, 0])
+             or count_nonzero(a[..., _strict_lower(m)]))
+    above = (count_nonzero(a[..., 0, 1])
+             or count_nonzero(a[..., _strict_lower(m).T]))
+
+    # A triangular permutation matrix is the identity, found diagonal
+    if not below:
+        return 'upper' if above else 'diagonal'
+    if not above:
+        return 'lower'
+    if (count_nonzero(a[..., 0, :]) * m * m == a.size
+            and _is_permutation(a)):
+        return 'permutation'
+    if (not count_nonzero(a[..., 0, :] != a[..., :, 0])
+            and not count_nonzero(a != swapaxes(a, -1, -2))):
+        return 'symmetric'
+    return 'general'
+
+def _strict_lower(m, _masks={}):
+    mask = _masks.get(m)
+    if mask is None:
+        mask = _masks[m] = tri(m, k=-1, dtype=bool)
+    return mask
+
+def _is_permutation(a):
+    return (((a == 0) | (a == 1)).all()
+            and (a.sum(axis=-1) == 1).all() and (a.sum(axis=-2) == 1).all())
+
+def diagonal_power(a, n):
+    """
+    Power of diagonal matrices, elementwise on the diagonal in O(M).
+    """
+    result = zeros_like(a)
+    i = arange(a.shape[-1])
+    result[..., i, i] = a[..., i, i] ** n
+    return result
+
+def permutation_power(a, n):
+    """
+    Power of permutation matrices by composing their index maps, using
+    O(M log n) index operations instead of matrix products. Row i of a
+    permutation matrix has its one in column sigma[i], and
+    sigma_(PQ) = sigma_Q[sigma_P].
+    """
+    sigma = a.argmax(axis=-1)
+    power = None
+    while n > 0:
+        n, bit = divmod(n, 2)
+        if bit:
+            power = sigma if power is None else _compose(power, sigma)
+        if n:
+            sigma = _compose(sigma, sigma)
+
+    result = zeros_like(a)
+    put_along_axis(result, power[..., newaxis], 1, axis=-1)
+    return result
+
+def _compose(first, then):
+    return take_along_axis(then, first, axis=-1)
+
+def structured_matmul(structure, a):
+    """
+    Return ``fmatmul(x, y, out=None)`` multiplying powers of `a` with a BLAS
+    routine that exploits `structure`, or None when there is none: for
+    stacks, for element types BLAS does not support, or without scipy.
+
+    'upper' / 'lower'
+        trmm, which multiplies by a triangular matrix in half the FLOPs.
+    'symmetric'
+        syrk for squarings, which computes one triangle of x @ x.T (equal to
+        x @ x for symmetric x) in half the FLOPs; other products, which are
+        symmetric too since powers of `a` commute, use matmul.
+
+    Both routines write straight into a C-contiguous `out`, through its
+    Fortran-ordered transpose, so the buffers `matrix_power` passes are
+    reused as with matmul. For other layouts BLAS works on a copy, which
+    is returned instead of `out` for the caller to copy. `out` must not
+    overlap `x`.
+    """
+    if structure not in ('upper', 'lower', 'symmetric') or a.ndim != 2:
+        return None
+    if a.dtype.type not in _BLAS_TYPES:
+        return None
+    try:
+        from scipy.linalg.blas import get_blas_funcs
+    except ImportError:
+        return None
+
+    if structure == 'symmetric':
+        syrk, = get_blas_funcs(('syrk',), (a,))
+        rows, cols = triu_indices(a.shape[-1], 1)
+
+        def fmatmul(x, y, out=None):
+            if x is not y:
+                return matmul(x, y, out=out)
+            target = _target(x, out)
+            # x.T @ x.T.T is x @ x; its upper triangle in the transposed
+            # view is the lower triangle of the result, mirrored upwards
+            c = target.T
+            result = _result(target, c, syrk(1.0, x.T, c=c, overwrite_c=1))
+            result[rows, cols] = result[cols, rows]
+            return result
+        return fmatmul
+
+    trmm, = get_blas_funcs(('trmm',), (a,))
+    # (x @ y).T = y.T @ x.T, with x.T triangular the other way round
+    lower = int(structure == 'upper')
+
+    def fmatmul(x, y, out=None):
+        target = _target(x, out)
+        if target is not y:
+            target[...] = y
+        b = target.T
+        return _result(target, b, trmm(1.0, x.T, b, side=1, lower=lower,
+                                       overwrite_b=1))
+    return fmatmul
+
+def _target(x, out):
+    return empty(x.shape, dtype=x.dtype) if out is None else out
+
+def _result(target, view, result):
+    # BLAS only works in place on Fortran-ordered data of its own type; for
+    # an `out` of another layout it returns a new array
+    return target if result is view else result.T
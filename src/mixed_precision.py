@@ -0,0 +1,150 @@
+from weakref import ref
+
+from numpy.core import (
+    matmul, sqrt, where, maximum, swapaxes, newaxis, promote_types, float32,
+    float64, complex64, complex128, finfo
+)
+from numpy import linalg
+from numpy.random import RandomState
+
+# Relative error estimate `matrix_power(precision='mixed')` accepts by default
+DEFAULT_MIXED_TOL = 1e-4
+
+# Single precision counterpart of every dtype the mixed mode supports
+SINGLE = {float64: float32, complex128: complex64}
+
+class ErrorTrackingMatmul(object):
+    """
+    Multiply powers of a float64 (or complex128) matrix in single precision
+    while keeping a running estimate of the error of every product.
+
+    Each array returned by `start` or by a product carries an absolute
+    error estimate E, per matrix of a stack and in the Frobenius norm |.|.
+    With u the unit roundoff of the working precision and ||.|| the
+    spectral norm, for an (M, M) matrix `a`
+        E(a) = u |a|
+        E(XY) = E(X) ||Y|| + ||X|| E(Y) + E(X) E(Y) + sqrt(M) u R(X, Y)
+        R(X, Y)**2 = sum_k |X[:, k]|**2 |Y[k, :]|**2  (<= |X|**2 ||Y||**2)
+    The first terms carry the errors of the operands; the last is the
+    probabilistic estimate of the rounding of one product, whose M-term
+    dot products accumulate errors of random sign. The spectral norms are
+    estimated by a few steps of power iteration, which approach them from
+    below, so E is an estimate rather than a rigorous bound; it costs
+    O(M**2) per O(M**3) product.
+
+    As soon as a product's relative estimate E(XY) / |XY| exceeds `tol` it
+    is recomputed in double precision. Every later product is double as
+    well; the error already accumulated is still carried. With
+    `single=False` every product is double from the start.
+
+    Only the estimate of each array is stored, and only while the array is
+    alive: entries are dropped as soon as their array is freed, so neither
+    are intermediates kept alive nor can the id of a freed array be
+    mistaken for a new one.
+
+    Parameters
+    ----------
+    a : (..., M, M) ndarray
+        float64 or complex128 matrix to be "powered."
+    tol : float
+        Largest relative error estimate accepted in single precision.
+    single : bool
+        Whether to start in single precision.
+    """
+
+    def __init__(self, a, tol=DEFAULT_MIXED_TOL, single=True):
+        self.a = a
+        self.tol = tol
+        self.double = a.dtype.type
+        self.dtype = SINGLE[self.double] if single else self.double
+        self.single_products = 0
+        self._gamma = {
+            dtype: sqrt(a.shape[-1]) * finfo(dtype).eps / 2
+            for dtype in (self.double, SINGLE[self.double])}
+        # id of a live array -> (weak reference to it, its error estimate)
+        self._errors = {}
+
+    def start(self):
+        """
+        Return `a` in the working precision, with its rounding error.
+        """
+        start = self.a.astype(self.dtype)
+        unit = finfo(self.dtype).eps / 2
+        return self._track(start, unit * _norm(self.a))
+
+    def __call__(self, x, y, out=None):
+        ex, ey = self._error(x), self._error(y)
+        inherited = ex*_norm2(y) + _norm2(x)*ey + ex*ey
+        rounding = _rounding_scale(x, y)
+
+        z = self._product(x, y, out)
+        error = inherited + self._gamma[self.dtype]*rounding
+        if self.dtype != self.double:
+            if (error <= self.tol * _norm(z)).all():
+                self.single_products += 1
+                return self._track(z, error)
+            # From here on the estimate would only grow, so stay in double
+            self.dtype = self.double
+            z = self._product(x, y, out)
+            error = inherited + self._gamma[self.double]*rounding
+        return self._track(z, error)
+
+    def error_estimate(self, result):
+        """
+        Largest relative error estimate E / |result| over the matrices of
+        the tracked `result`.
+        """
+        norm = _norm(result)
+        error = self._error(result)
+        return float((error / where(norm > 0, norm, 1)).max())
+
+    def _product(self, x, y, out):
+        x = x.astype(self.dtype, copy=False)
+        y = y.astype(self.dtype, copy=False)
+        if out is None or out.dtype == self.dtype:
+            return matmul(x, y, out=out)
+        # The products run in the working precision whatever the type of
+        # `out`, which receives them cast; matmul only casts into `out`
+        # since NumPy 1.16, so go through a temporary
+        out[...] = matmul(x, y)
+        return out
+
+    def _track(self, z, error):
+        key = id(z)
+        errors = self._errors
+        # The entry goes away with its array; a buffer written again by
+        # out= simply gets a new estimate
+        errors[key] = (ref(z, lambda _: errors.pop(key, None)), error)
+        return z
+
+    def _error(self, x):
+        tracked = self._errors.get(id(x))
+        if tracked is None or tracked[0]() is not x:
+            raise ValueError("array not produced by this multiplier")
+        return tracked[1]
+
+def _norm(x):
+    return linalg.norm(x, axis=(-2, -1)).astype(float64)
+
+def _rounding_scale(x, y):
+    cols = (abs(x)**2).sum(axis=-2, dtype=float64)
+    rows = (abs(y)**2).sum(axis=-1, dtype=float64)
+    return sqrt((cols * rows).sum(axis=-1))
+
+def _norm2(x, steps=4):
+    """
+    Estimate the spectral norm of every matrix of `x` by power iteration on
+    x^H x, from a fixed pseudo-random start. The estimate approaches the
+    norm from below, so it is kept above |x| / sqrt(M), a lower bound too.
+    """
+    m = x.shape[-1]
+    x = x.astype(promote_types(x.dtype, float64), copy=False)
+    v = RandomState(m).standard_normal((m, 1))
+    xh = swapaxes(x, -1, -2).conj()
+    sigma = 0
+    for _ in range(steps):
+        v = v / linalg.norm(v, axis=(-2, -1))[..., newaxis, newaxis]
+        w = matmul(x, v)
+        sigma = linalg.norm(w, axis=(-2, -1))
+        v = matmul(xh, w)
+    return maximum(sigma.astype(float64), _norm(x) / sqrt(m))
@@ -0,0 +1,103 @@
+from numpy.core import (
+    asanyarray, matmul, int64, uint64, integer
+)
+from numpy.core.getlimits import iinfo
+from numpy.core.numerictypes import issubdtype
+
+# Products are accumulated in int64, so every partial sum stays below this
+_INT64_LIMIT = 1 << 63
+# ...or in uint64 once they have to be split into digits
+_UINT64_LIMIT = 1 << 64
+
+def reduce_modulo(a, modulus):
+    """
+    Return the integer array `a` reduced into [0, modulus) as int64.
+    Object arrays of Python integers and unsigned arrays are reduced before
+    the conversion, so arbitrarily large entries and uint64 entries of 2**63
+    and above are accepted.
+    """
+    if not 0 < modulus < _INT64_LIMIT:
+        raise ValueError("modulus must be positive and below 2**63")
+    a = asanyarray(a)
+    if a.dtype == object:
+        return (a % modulus).astype(int64)
+    if not issubdtype(a.dtype, integer):
+        raise TypeError("a modulus requires an integer matrix, got %s"
+                        % a.dtype)
+    if a.dtype.kind == 'u' and modulus <= iinfo(a.dtype).max:
+        a = a % a.dtype.type(modulus)
+    return a.astype(int64) % modulus
+
+def modular_matmul(modulus, size):
+    """
+    Return ``fmatmul(x, y, out=None)`` computing ``x @ y % modulus`` for
+    (..., size, size) int64 arrays with entries in [0, modulus), without
+    ever overflowing, for any modulus below 2**63.
+
+    When ``size * (modulus - 1)**2`` fits in int64 this is a single matmul
+    followed by a reduction, both in `out` if given. Otherwise `y` is split
+    into base 2**s digits, and `x` too if even a single bit of `y` times
+    `x` could overflow, and the product is accumulated in uint64 with
+    Horner's rule, one matmul per pair of digits:
+        acc = (acc * 2**s % modulus + x @ digit) % modulus
+    `s` is the widest for which ``x @ digit + modulus - 1`` stays below
+    2**64; ``acc * 2**s`` is reduced in as many steps as needed to stay
+    below it as well. The accumulator is returned as is, leaving the copy
+    into `out` to the caller, so that instrumentation reports it as
+    allocated.
+    """
+    modulus = int(modulus)
+    if not 0 < modulus < _INT64_LIMIT:
+        raise ValueError("modulus must be positive and below 2**63")
+
+    largest = modulus - 1
+    if size * largest * largest < _INT64_LIMIT:
+        def fmatmul(x, y, out=None):
+            z = matmul(x, y, out=out)
+            z %= modulus
+            return z
+        return fmatmul
+
+    room = _UINT64_LIMIT - 1 - largest
+    shift = _digit_bits(room // (size * largest))
+    if shift:
+        x_digits = 1
+    else:
+        # Split `x` as well, into digits as wide as those of `y`
+        shift = 1
+        while size * ((2 << shift) - 1)**2 <= room:
+            shift += 1
+        x_digits = -(-largest.bit_length() // shift)
+    y_digits = -(-largest.bit_length() // shift)
+    # Bits `acc` can be shifted by before it has to be reduced again
+    step = 64 - largest.bit_length()
+
+    def horner(terms, width):
+        acc = None
+        for term in terms:
+            if acc is not None:
+                for bits in range(width, 0, -step):
+                    acc <<= uint64(min(bits, step))
+                    acc %= uint64(modulus)
+                term += acc
+            term %= uint64(modulus)
+            acc = term
+        return acc
+
+    def fmatmul(x, y, out=None):
+        x, y = x.view(uint64), y.view(uint64)
+        ys = _digits(y, shift, y_digits)
+        xs = _digits(x, shift, x_digits) if x_digits > 1 else [x]
+        acc = horner((horner((matmul(xa, yb) for yb in ys), shift)
+                      for xa in xs), shift)
+        return acc.view(int64)
+    return fmatmul
+
+def _digit_bits(count):
+    # Widest s with 2**s - 1 <= count
+    return (count + 1).bit_length() - 1
+
+def _digits(a, width, count):
+    # Base 2**width digits of `a`, most significant first
+    mask = uint64((1 << width) - 1)
+    return [(a >> uint64(width * d)) & mask for d in range(count - 1, -1, -1)]
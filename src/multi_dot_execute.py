@@ -0,0 +1,283 @@
+from multiprocessing.pool import ThreadPool
+
+try:
+    from queue import Queue
+except ImportError:  # Python 2
+    from Queue import Queue
+
+from numpy.core import (
+    asanyarray, matmul, dot, empty, result_type, newaxis
+)
+
+from src.instrumentation import instrument
+from src.matrix_power import matrix_power
+
+def multi_dot_execute(arrays, s, out=None, workers=None):
+    """
+    Evaluate the chain product A_0 A_1 ... A_{n-1} in the order encoded by
+    the split table `s`, as returned by `multi_dot_matrix_chain_order`.
+
+    The parenthesization tree is walked in post-order. Every intermediate is
+    only live from the multiplication producing it to the one consuming it,
+    so a small pool of flat buffers, sized once up front, is enough to hold
+    all of them: each product is written with `out=` into a reshaped prefix
+    of a free buffer. Only the final product gets its own array (or `out`).
+
+    With `workers` greater than one, independent sub-products such as the
+    two halves of (AB)(CD) run concurrently on a thread pool instead; numpy
+    releases the GIL inside matmul. Every product still multiplies the same
+    operands as the sequential walk, so the result is identical. The pool
+    is skipped in this mode and each intermediate gets a fresh array.
+    Object chains are always evaluated sequentially.
+
+    Where s[i, j] is -1, A_i..A_j is a run of one repeated factor planned
+    as a power, see `multi_dot_matrix_chain_order(repeated=...)`, and is
+    computed by `matrix_power` from A_i alone.
+
+    Every product is reported to the `instrumentation` hooks, if any are
+    registered.
+
+    Parameters
+    ----------
+    arrays : sequence of (M, N) array_like
+        The factors of the chain. As in `numpy.linalg.multi_dot`, the first
+        may be 1-D, taken as a row vector, and the last too, taken as a
+        column vector; the result then has no such axis.
+    s : (n, n) array_like
+        s[i, j] is the k at which the product A_i..A_j is split.
+    out : ndarray, optional
+        Array receiving the result. It must have the shape of the product,
+        without the axes of 1-D ends, and the dtype the factors promote to.
+    workers : int, optional
+        Number of threads evaluating independent sub-products. None or 1
+        evaluates sequentially with buffer reuse.
+
+    Returns
+    -------
+    output : ndarray
+        The product of all factors, written into `out` if given.
+
+    Examples
+    --------
+    >>> arrays = [np.ones((10, 100)), np.ones((100, 5)), np.ones((5, 50))]
+    >>> s = multi_dot_matrix_chain_order(arrays)
+    >>> multi_dot_execute(arrays, s).shape
+    (10, 50)
+    """
+    arrays = [asanyarray(a) for a in arrays]
+    n = len(arrays)
+    if n == 1:
+        if out is None:
+            return arrays[0].copy()
+        out[...] = arrays[0]
+        return out
+
+    # As in `prepare_chain`, a 1-D first factor is a row vector and a 1-D
+    # last factor a column vector; their axes are dropped from the result
+    row, column = arrays[0].ndim == 1, arrays[-1].ndim == 1
+    if row:
+        arrays[0] = arrays[0].reshape(1, -1)
+    if column:
+        arrays[-1] = arrays[-1].reshape(-1, 1)
+    if not (row or column):
+        return _execute(arrays, s, out, workers)
+    if out is None:
+        result = _execute(arrays, s, None, workers)
+        return result[0 if row else slice(None), 0 if column else slice(None)]
+    # Indexing with newaxis always gives a view, so the product still lands
+    # in `out`
+    _execute(arrays, s, out[newaxis if row else slice(None),
+                            newaxis if column else slice(None)], workers)
+    return out
+
+def _execute(arrays, s, out, workers):
+    """
+    `multi_dot_execute` on two-dimensional factors.
+    """
+    n = len(arrays)
+    dtype = result_type(*arrays)
+    steps = _schedule(s, n)
+    fmul = instrument(dot if dtype == object else matmul,
+                      'multi_dot_execute')
+
+    # Object arrays are not supported by matmul in every numpy release and
+    # cannot be written through out=, so multiply them serially without a
+    # pool, also when workers are requested; their products hold the GIL
+    # anyway.
+    if dtype == object:
+        results = {}
+        for i, k, j in steps:
+            if k < 0:
+                results[i, j] = _power(arrays[i], j - i + 1)
+                continue
+            results[i, j] = fmul(_operand(arrays, results, i, k),
+                                 _operand(arrays, results, k + 1, j))
+        if out is None:
+            return results[0, n - 1]
+        out[...] = results[0, n - 1]
+        return out
+
+    if workers is not None and workers > 1:
+        return _execute_parallel(arrays, steps, fmul, workers, out)
+
+    rows = [a.shape[0] for a in arrays]
+    cols = [a.shape[1] for a in arrays]
+    sizes = [rows[i] * cols[j] for i, _, j in steps]
+    slots, capacities = _plan_buffers(steps, sizes)
+    pool = [empty(c, dtype=dtype) for c in capacities]
+
+    results = {}
+    for (i, k, j), slot in zip(steps, slots):
+        if slot is not None:
+            target = pool[slot][:rows[i] * cols[j]].reshape(rows[i], cols[j])
+        elif out is None:
+            target = empty((rows[i], cols[j]), dtype=dtype)
+        else:
+            target = out
+        if k < 0:
+            results[i, j] = _power(arrays[i], j - i + 1, target)
+            continue
+        results[i, j] = fmul(_operand(arrays, results, i, k),
+                             _operand(arrays, results, k + 1, j),
+                             out=target)
+
+    return results[0, n - 1]
+
+def _execute_parallel(arrays, steps, fmul, workers, out):
+    """
+    Run `steps` on a thread pool, submitting each product as soon as both
+    of its operands are available.
+    """
+    root = steps[-1]
+    waiting = {}
+    parent_of = {}
+    for i, k, j in steps:
+        waiting[i, j] = 0
+        for child in _children(i, k, j):
+            if child[0] != child[1]:
+                waiting[i, j] += 1
+                parent_of[child] = (i, k, j)
+
+    done = Queue()
+    results = {}
+
+    def run(step, left, right):
+        i, k, j = step
+        target = out if step == root else None
+        try:
+            if k < 0:
+                product = _power(left, j - i + 1, target)
+            elif target is not None:
+                product = fmul(left, right, out=target)
+            else:
+                product = fmul(left, right)
+        except Exception as e:
+            done.put((step, None, e))
+        else:
+            done.put((step, product, None))
+
+    def submit(step):
+        i, k, j = step
+        if k < 0:
+            pool.apply_async(run, (step, arrays[i], None))
+            return
+        left = arrays[i] if i == k else results.pop((i, k))
+        right = arrays[j] if k + 1 == j else results.pop((k + 1, j))
+        pool.apply_async(run, (step, left, right))
+
+    pool = ThreadPool(workers)
+    try:
+        for step in steps:
+            if waiting[step[0], step[2]] == 0:
+                submit(step)
+        for _ in range(len(steps)):
+            (i, k, j), product, error = done.get()
+            if error is not None:
+                raise error
+            results[i, j] = product
+            parent = parent_of.get((i, j))
+            if parent is not None:
+                waiting[parent[0], parent[2]] -= 1
+                if waiting[parent[0], parent[2]] == 0:
+                    submit(parent)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return results[root[0], root[2]]
+
+def _operand(arrays, results, i, j):
+    return arrays[i] if i == j else results[i, j]
+
+def _children(i, k, j):
+    return () if k < 0 else ((i, k), (k + 1, j))
+
+def _power(a, n, out=None):
+    if out is None or out.dtype != a.dtype:
+        result = matrix_power(a, n)
+        if out is None:
+            return result
+        out[...] = result
+        return out
+    return matrix_power(a, n, out=out)
+
+def _schedule(s, n):
+    """
+    Return the multiplications of the chain as (i, k, j) triples in
+    post-order, so both operands of a step are ready before it runs.
+    Powers of a repeated factor A_i are (i, -1, j).
+    """
+    steps = []
+    # Explicit stack: long, left-deep chains would exceed the recursion limit
+    stack = [(0, n - 1, False)]
+    while stack:
+        i, j, expanded = stack.pop()
+        if i == j:
+            continue
+        k = int(s[i, j])
+        if k < 0:
+            # A power node has no operands in the chain but A_i itself
+            steps.append((i, -1, j))
+        elif expanded:
+            steps.append((i, k, j))
+        else:
+            stack.append((i, j, True))
+            stack.append((k + 1, j, False))
+            stack.append((i, k, False))
+    return steps
+
+def _plan_buffers(steps, sizes):
+    """
+    Assign every step except the last (the result) to a buffer of the pool.
+    Returns the buffer index per step (None for the result) and the number
+    of elements each buffer must hold.
+    """
+    slot_of = {}
+    slots = []
+    capacities = []
+    free = []
+    for t, (i, k, j) in enumerate(steps):
+        if t == len(steps) - 1:
+            slot = None
+        elif free:
+            # Best fit: the smallest free buffer that is large enough,
+            # otherwise grow the largest one.
+            fits = [b for b in free if capacities[b] >= sizes[t]]
+            if fits:
+                slot = min(fits, key=capacities.__getitem__)
+            else:
+                slot = max(free, key=capacities.__getitem__)
+                capacities[slot] = sizes[t]
+            free.remove(slot)
+        else:
+            slot = len(capacities)
+            capacities.append(sizes[t])
+        slots.append(slot)
+
+        # The operands die once this product is written
+        for child in _children(i, k, j):
+            if child in slot_of:
+                free.append(slot_of.pop(child))
+        slot_of[i, j] = slot
+
+    return slots, capacities
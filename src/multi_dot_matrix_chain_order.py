@@ -1,34 +1,22 @@
 from numpy.core import (
-    zeros, empty, double, Inf, intp
+    zeros, empty, double, Inf, intp, asarray, arange, newaxis, where, dtype,
+    iinfo
 )
 
-# Error object
-class LinAlgError(Exception):
-    """
-    Generic Python-exception-derived object raised by linalg functions.
-    General purpose exception class, derived from Python's exception.Exception
-    class, programmatically raised in linalg functions when a Linear
-    Algebra-related condition would prevent further correct execution of the
-    function.
-    Parameters
-    ----------
-    None
-    Examples
-    --------
-    >>> from numpy import linalg as LA
-    >>> LA.inv(np.zeros((2,2)))
-    Traceback (most recent call last):
-      File "<stdin>", line 1, in <module>
-      File "...linalg.py", line 350,
-        in inv return wrap(solve(a, identity(a.shape[0], dtype=a.dtype)))
-      File "...linalg.py", line 249,
-        in solve
-        raise LinAlgError('Singular matrix')
-    numpy.linalg.LinAlgError: Singular matrix
-    """
-    pass
+from src.chain_cost_models import FlopsCostModel, estimate_peak_bytes
+from src.chain_powers import power_cost, repeated_factor_runs
+from src.hu_shing_chain_order import hu_shing_chain_order
+from src.packed_triangle import PackedTriangle, packed_index, split_dtype
+from src.validation import LinAlgError, prepare_chain, prepare_chain_shapes
+
+# Chains longer than this are planned by Hu-Shing when engine='auto'
+HU_SHING_THRESHOLD = 1000
 
-def multi_dot_matrix_chain_order(arrays, return_costs=False):
+def multi_dot_matrix_chain_order(arrays, return_costs=False, engine='loop',
+                                 auto_threshold=HU_SHING_THRESHOLD,
+                                 cost_model=None, return_peak_bytes=False,
+                                 check=True, packed=False, cost_dtype=double,
+                                 repeated=None):
     """
     Return a np.array that encodes the optimal order of mutiplications.
     The optimal order array is then used by `_multi_dot()` to do the
@@ -39,27 +27,255 @@ def multi_dot_matrix_chain_order(arrays, return_costs=False):
         cost[i, j] = min([
             cost[prefix] + cost[suffix] + cost_mult(prefix, suffix)
             for k in range(i, j)])
+
+    `engine` selects how the tables are filled:
+        'loop'        the scalar triple loop, kept as the reference
+        'vectorized'  one batched NumPy operation per diagonal `l`
+        'hu_shing'    near-optimal polygon partitioning, see
+                      `hu_shing_chain_order`
+        'auto'        'hu_shing' for chains of more than `auto_threshold`
+                      matrices, 'vectorized' otherwise
+    The two DP engines return the same upper triangle of `s` and `m`.
+
+    `cost_model` replaces cost_mult, see `chain_cost_models`. The default
+    `FlopsCostModel` counts scalar multiplications; `MemoryCostModel` also
+    charges for intermediate bytes and can exclude splits whose intermediate
+    exceeds a memory budget, in which case the DP engines are used.
+    If `return_peak_bytes` is `True` the estimated peak bytes of the chosen
+    order, see `estimate_peak_bytes`, is returned last.
+
+    As in `numpy.linalg.multi_dot`, a 1-D first factor is planned as a
+    (1, N) row vector and a 1-D last factor as an (N, 1) column vector.
+    Shapes are checked up front: neighbours that do not chain together
+    raise LinAlgError before any planning is done.
+
+    With `packed` the tables are returned as `PackedTriangle` objects that
+    store only the upper triangle, `s` in the narrowest unsigned integer
+    dtype holding n - 1, which takes less than half the memory; `s[i, j]`
+    and `m[i, j]` read as before. The DP engines fill the packed tables
+    directly, without ever allocating the full ones; 'hu_shing' returns
+    `SparseTriangle` tables holding just the cells of its split tree.
+
+    `cost_dtype` is the dtype of `m`. Doubles round costs above 2**53,
+    which can pick a different split than exact arithmetic; int64 is exact
+    and raises OverflowError up front when the chain's costs could exceed
+    it, object sums arbitrarily large Python ints in the same vectorized
+    operations. Integer costs require FlopsCostModel.
+
+    `repeated` ('identity' or 'content') detects runs of consecutive
+    identical factors, see `chain_powers.repeated_factor_runs`. Any part
+    A_i..A_j of such a run may then also be computed as a power by the
+    squaring ladder of `matrix_power`, costing about log2(j - i + 1)
+    products instead of j - i; the DP engines weigh this against the
+    ordinary splits, which still win e.g. when a vector is multiplied
+    through the run. s[i, j] is -1 where the power is chosen, which
+    `multi_dot_execute` evaluates with `matrix_power`; packed split tables
+    are then signed. Hu-Shing does not support it, nor do chains given
+    by their shapes only, which raise ValueError.
+
+    `arrays` may also be the `ChainOperands` returned by
+    `validation.prepare_chain`, which skips validating them again; with
+    `check=False` the shapes are trusted to chain together.
     """
-    n = len(arrays)
     # p stores the dimensions of the matrices
     # Example for p: A_{10x100}, B_{100x5}, C_{5x50} --> p = [10, 100, 5, 50]
-    p = [a.shape[0] for a in arrays] + [arrays[-1].shape[1]]
+    chain = prepare_chain(arrays, check)
+    p = list(chain.dims)
+    runs = None
+    if repeated:
+        if chain.arrays is None:
+            raise ValueError("repeated factors can only be detected in a "
+                             "chain of arrays, not of shapes")
+        runs = repeated_factor_runs(chain.arrays, repeated)
+    return _plan(p, return_costs, engine, auto_threshold, cost_model,
+                 return_peak_bytes, packed, cost_dtype, runs)
+
+def matrix_chain_order_from_shapes(shapes, return_costs=False, engine='loop',
+                                   auto_threshold=HU_SHING_THRESHOLD,
+                                   cost_model=None, return_peak_bytes=False,
+                                   check=True, packed=False,
+                                   cost_dtype=double):
+    """
+    Same as `multi_dot_matrix_chain_order`, for a chain known only by its
+    shapes, e.g. of arrays that are not loaded yet. Plans computed this way
+    can be stored offline and later passed to `multi_dot_execute`.
+
+    `shapes` is either the dimension sequence p, A_i being (p[i], p[i+1]),
+    or a list of one shape tuple per factor, with a 1-tuple allowed for a
+    vector at either end. See `validation.prepare_chain_shapes`.
+
+    Examples
+    --------
+    >>> matrix_chain_order_from_shapes([10, 100, 5, 50])[0, 2]
+    1
+    >>> matrix_chain_order_from_shapes([(10, 100), (100, 5), (5, 50)])[0, 2]
+    1
+    """
+    p = list(prepare_chain_shapes(shapes, check).dims)
+    return _plan(p, return_costs, engine, auto_threshold, cost_model,
+                 return_peak_bytes, packed, cost_dtype)
+
+def _plan(p, return_costs, engine, auto_threshold, cost_model,
+          return_peak_bytes, packed, cost_dtype, runs=None):
+    s, m = _chain_order(p, engine, auto_threshold, cost_model, packed,
+                        cost_dtype, runs)
+
+    result = (s, m) if return_costs else (s,)
+    if return_peak_bytes:
+        itemsize = (cost_model or _FLOPS).itemsize
+        result += (estimate_peak_bytes(s, p, itemsize),)
+    return result if len(result) > 1 else s
+
+def _chain_order(p, engine, auto_threshold, cost_model=None, packed=False,
+                 cost_dtype=double, runs=None):
+    cost_model = cost_model or _FLOPS
+    # Hu-Shing partitions by products of vertex weights, i.e. FLOPs only
+    flops_only = type(cost_model) is FlopsCostModel
+    cost_dtype = _check_cost_dtype(cost_dtype, p, flops_only)
+    if engine == 'auto':
+        long_chain = len(p) - 1 > auto_threshold
+        hu_shing = long_chain and flops_only and runs is None
+        engine = 'hu_shing' if hu_shing else 'vectorized'
+    elif engine == 'hu_shing' and not flops_only:
+        raise ValueError("the 'hu_shing' engine only supports FlopsCostModel")
+    elif engine == 'hu_shing' and runs is not None:
+        raise ValueError("the 'hu_shing' engine cannot plan repeated "
+                         "factors as powers")
+
+    try:
+        order = _ENGINES[engine]
+    except KeyError:
+        raise ValueError("unknown engine %r, expected one of %s"
+                         % (engine, sorted(_ENGINES) + ['auto']))
+
+    s, m = order(p, cost_model, packed, cost_dtype, runs)
+    if m[0, -1] == Inf:
+        raise ValueError("no order of the chain keeps every intermediate "
+                         "within the memory budget")
+    return s, m
+
+def _check_cost_dtype(cost_dtype, p, flops_only):
+    cost_dtype = dtype(cost_dtype)
+    if cost_dtype.kind == 'f':
+        return cost_dtype
+    if cost_dtype.kind not in 'iO':
+        raise ValueError("cost_dtype must be a float, signed integer or "
+                         "object dtype, not %s" % cost_dtype)
+    if not flops_only:
+        raise ValueError("integer costs are only supported by FlopsCostModel")
+    if cost_dtype.kind == 'i':
+        # Any order of A_i..A_j multiplies j - i times, each costing the
+        # product of three distinct dimensions, at most that of the three
+        # largest, which bounds every cost and candidate the engines sum
+        bound = len(p) - 2
+        for d in sorted(int(d) for d in p)[-3:]:
+            bound *= d
+        if bound > iinfo(cost_dtype).max:
+            raise OverflowError("costs of this chain may overflow %s, use "
+                                "cost_dtype=object" % cost_dtype)
+    return cost_dtype
+
+def _chain_order_loop(p, cost_model, packed=False, cost_dtype=double,
+                      runs=None):
+    n = len(p) - 1
     # m is a matrix of costs of the subproblems
     # m[i,j]: min number of scalar multiplications needed to compute A_{i..j}
-    m = zeros((n, n), dtype=double)
     # s is the actual ordering
     # s[i, j] is the value of k at which we split the product A_i..A_j
-    s = empty((n, n), dtype=intp)
+    # Packed tables are indexed like the full ones and filled in place
+    if packed:
+        size = n*(n + 1)//2
+        m = PackedTriangle(zeros(size, dtype=cost_dtype), n)
+        s = PackedTriangle(zeros(size, dtype=split_dtype(n, runs is not None)),
+                           n)
+    else:
+        m = zeros((n, n), dtype=cost_dtype)
+        s = empty((n, n), dtype=intp)
+    cost_mult = cost_model.split_cost
 
     for l in range(1, n):
         for i in range(n - l):
             j = i + l
-            m[i, j] = Inf
+            best = Inf
             for k in range(i, j):
-                q = m[i, k] + m[k+1, j] + p[i]*p[k+1]*p[j+1]
-                if q < m[i, j]:
-                    m[i, j] = q
+                q = m[i, k] + m[k+1, j] + cost_mult(p[i], p[k+1], p[j+1])
+                if q < best:
+                    best = q
                     s[i, j] = k  # Note that Cormen uses 1-based index
+            # A_i..A_j inside a run of one repeated factor: its power
+            if runs is not None and runs[i] >= 0 and runs[i] == runs[j]:
+                q = power_cost(l + 1, p[i], cost_model)
+                if q < best:
+                    best = q
+                    s[i, j] = -1
+            m[i, j] = best
+            # An intermediate the model rejects makes every plan using it
+            # infeasible; the final product (l == n - 1) is always needed.
+            if l < n - 1 and not cost_model.fits(p[i], p[j+1]):
+                m[i, j] = Inf
+
+    return s, m
+
+def _chain_order_vectorized(p, cost_model, packed=False, cost_dtype=double,
+                            runs=None):
+    """
+    The diagonal-sweep DP. `p` may also be a (batch, n + 1) array of chains
+    of one length, planned together with a leading batch axis on every
+    table (full layout only, without `runs`), see `batch_chain_order`.
+    """
+    # Object costs keep the dimensions as Python ints for exact products
+    p = asarray([int(d) for d in p] if cost_dtype == object else p,
+                dtype=cost_dtype)
+    batch, n = p.shape[:-1], p.shape[-1] - 1
+    # Both layouts are filled through flat positions, so the packed tables
+    # are never expanded to n**2 entries
+    if packed:
+        size = n*(n + 1)//2
+        m = zeros(size, dtype=cost_dtype)
+        s = zeros(size, dtype=split_dtype(n, runs is not None))
+        position = lambda i, j: packed_index(i, j, n)
+    else:
+        m = zeros(batch + (n*n,), dtype=cost_dtype)
+        s = zeros(batch + (n*n,), dtype=intp)
+        position = lambda i, j: i*n + j
+
+    # On diagonal `l` every cell (i, i + l) has exactly `l` candidate splits
+    # k = i + t, t in [0, l), so all of them fit in one (n - l, l) block.
+    # argmin returns the first minimum, matching the strict `<` of the loop.
+    for l in range(1, n):
+        i = arange(n - l)[:, newaxis]
+        k = i + arange(l)[newaxis, :]
+        j = i + l
+        q = (m[..., position(i, k)] + m[..., position(k+1, j)]
+             + cost_model.split_cost(p[..., i], p[..., k+1], p[..., j+1]))
+        best = q.argmin(axis=-1)
+        rows = i[:, 0]
+        cost = q.min(axis=-1)
+        split = rows + best
+        if runs is not None:
+            power = (runs[rows] >= 0) & (runs[rows] == runs[rows + l])
+            if power.any():
+                q_power = power_cost(l + 1, p[rows], cost_model)
+                power &= q_power < cost
+                cost = where(power, q_power, cost)
+                split = where(power, -1, split)
+        # Integer costs come with FlopsCostModel, which excludes no split
+        if l < n - 1 and m.dtype.kind == 'f':
+            cost = where(cost_model.fits(p[..., rows], p[..., rows + l + 1]),
+                         cost, Inf)
+        cells = position(rows, rows + l)
+        m[..., cells] = cost
+        s[..., cells] = split
+
+    if packed:
+        return PackedTriangle(s, n), PackedTriangle(m, n)
+    return s.reshape(batch + (n, n)), m.reshape(batch + (n, n))
 
-    return (s, m) if return_costs else s
+_ENGINES = {
+    'loop': _chain_order_loop,
+    'vectorized': _chain_order_vectorized,
+    'hu_shing': lambda p, cost_model, packed, cost_dtype, runs:
+        hu_shing_chain_order(p, True, packed, cost_dtype),
+}
 
+_FLOPS = FlopsCostModel()
@@ -0,0 +1,232 @@
+from numpy.core import (
+    asarray, zeros, arange, min_scalar_type, integer
+)
+from numpy.core import dtype as _dtype
+from numpy.core.numerictypes import issubdtype
+from numpy.lib.stride_tricks import broadcast_arrays
+
+def packed_index(i, j, n):
+    """
+    Position of entry (i, j), i <= j, of an (n, n) upper triangle stored row
+    by row, diagonal included, in a flat array of n*(n+1)/2 entries. `i`
+    and `j` may be integer arrays.
+    """
+    # Rows 0..i-1 hold n + (n-1) + ... + (n-i+1) entries before row i
+    return i*(2*n - i - 1)//2 + j
+
+def split_dtype(n, signed=False):
+    """
+    Smallest unsigned integer dtype holding every split point k < n, or
+    signed one that also holds -1.
+    """
+    if signed:
+        return min_scalar_type(-max(n, 1))
+    return min_scalar_type(max(n - 1, 0))
+
+class PackedTriangle(object):
+    """
+    Upper triangle, diagonal included, of an (n, n) table such as the `s`
+    and `m` tables of `multi_dot_matrix_chain_order`, stored packed in
+    n*(n+1)/2 entries instead of n**2.
+
+    ``t[i, j]`` reads or writes entry (i, j) like the full table would, for
+    integers (negative ones count from the end) or integer arrays with
+    i <= j. Entries below the diagonal are not stored; indexing one raises
+    IndexError.
+
+    Parameters
+    ----------
+    data : (n*(n+1)/2,) ndarray
+        The packed entries, see `packed_index`.
+    n : int
+        Size of the table.
+
+    Examples
+    --------
+    >>> t = PackedTriangle.from_array(np.arange(9).reshape(3, 3))
+    >>> t.data
+    array([0, 1, 2, 4, 5, 8])
+    >>> t[1, 2], t[0, -1]
+    (5, 2)
+    """
+
+    def __init__(self, data, n):
+        if data.shape != (n*(n + 1)//2,):
+            raise ValueError("%d packed entries expected for n=%d, got %s"
+                             % (n*(n + 1)//2, n, data.shape))
+        self.data = data
+        self.n = n
+
+    @classmethod
+    def from_array(cls, a, dtype=None):
+        """
+        Pack the upper triangle of the (n, n) array `a`, optionally cast to
+        `dtype`.
+        """
+        a = asarray(a)
+        n = a.shape[0]
+        rows, cols = _upper_indices(n)
+        return cls(a[rows, cols].astype(dtype or a.dtype), n)
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes
+
+    def __getitem__(self, index):
+        return self.data[self._position(index)]
+
+    def __setitem__(self, index, value):
+        self.data[self._position(index)] = value
+
+    def _position(self, index):
+        i, j = index
+        n = self.n
+        if isinstance(i, (int, integer)) and isinstance(j, (int, integer)):
+            i = i + n if i < 0 else i
+            j = j + n if j < 0 else j
+            if not 0 <= i <= j < n:
+                raise IndexError("entry (%d, %d) is not stored in the upper "
+                                 "triangle of a %dx%d table" % (i, j, n, n))
+            return packed_index(i, j, n)
+        i, j = asarray(i), asarray(j)
+        if not (issubdtype(i.dtype, integer) and issubdtype(j.dtype, integer)):
+            raise IndexError("only integer entries (i, j) are stored")
+        i = i + n*(i < 0)
+        j = j + n*(j < 0)
+        if not ((0 <= i) & (i <= j) & (j < n)).all():
+            raise IndexError("only entries (i, j) with 0 <= i <= j < %d are "
+                             "stored" % n)
+        return packed_index(i, j, n)
+
+    def toarray(self):
+        """
+        Return the full (n, n) table, zero below the diagonal.
+        """
+        full = zeros(self.shape, dtype=self.dtype)
+        full[_upper_indices(self.n)] = self.data
+        return full
+
+    def __len__(self):
+        return self.n
+
+class SparseTriangle(object):
+    """
+    Upper triangle of an (n, n) table of which only a few entries are set,
+    such as the `s` and `m` tables of `hu_shing_chain_order`, which fill
+    just the n - 1 cells of one split tree. Set entries are kept in a dict
+    keyed by (i, j); every other entry reads as zero, like in the full
+    tables the engines start from.
+
+    ``t[i, j]`` reads entry (i, j) for integers (negative ones count from
+    the end) or integer arrays with i <= j, and writes it for integers.
+    `setflags` and `view` follow `ndarray`, so a read-only table hands out
+    read-only views.
+
+    Parameters
+    ----------
+    n : int
+        Size of the table.
+    dtype : data-type
+        Type of the entries.
+
+    Examples
+    --------
+    >>> t = SparseTriangle(3, np.intp)
+    >>> t[0, 2] = 1
+    >>> t[0, -1], t[1, 2], t.nbytes
+    (1, 0, 8)
+    """
+
+    def __init__(self, n, dtype, data=None, base=None):
+        self.n = n
+        self.dtype = _dtype(dtype)
+        self.data = {} if data is None else data
+        self.base = base
+        self.writeable = base is None or base.writeable
+
+    @classmethod
+    def from_dict(cls, entries, n, dtype):
+        """
+        Build the table from a dict mapping (i, j), i <= j, to entries,
+        cast to `dtype`.
+        """
+        cast = _dtype(dtype).type
+        return cls(n, dtype, dict((cell, cast(value))
+                                  for cell, value in entries.items()))
+
+    @property
+    def shape(self):
+        return (self.n, self.n)
+
+    @property
+    def nbytes(self):
+        return len(self.data) * self.dtype.itemsize
+
+    def __getitem__(self, index):
+        i, j = index
+        zero = self.dtype.type(0)
+        if isinstance(i, (int, integer)) and isinstance(j, (int, integer)):
+            return self.data.get(self._cell(i, j), zero)
+        i, j = broadcast_arrays(i, j)
+        if not (issubdtype(i.dtype, integer) and issubdtype(j.dtype, integer)):
+            raise IndexError("only integer entries (i, j) are stored")
+        values = [self.data.get(self._cell(a, b), zero)
+                  for a, b in zip(i.ravel().tolist(), j.ravel().tolist())]
+        return asarray(values, dtype=self.dtype).reshape(i.shape)
+
+    def __setitem__(self, index, value):
+        if not self.writeable:
+            raise ValueError("assignment destination is read-only")
+        self.data[self._cell(*index)] = self.dtype.type(value)
+
+    def _cell(self, i, j):
+        n = self.n
+        i = int(i) + n if i < 0 else int(i)
+        j = int(j) + n if j < 0 else int(j)
+        if not 0 <= i <= j < n:
+            raise IndexError("entry (%d, %d) is not stored in the upper "
+                             "triangle of a %dx%d table" % (i, j, n, n))
+        return i, j
+
+    def setflags(self, write=None):
+        if write and self.base is not None and not self.base.writeable:
+            raise ValueError("cannot set WRITEABLE flag to True of this "
+                             "array")
+        if write is not None:
+            self.writeable = bool(write)
+
+    def view(self):
+        """
+        Return a table sharing the entries of this one.
+        """
+        return SparseTriangle(self.n, self.dtype, self.data,
+                              self if self.base is None else self.base)
+
+    def toarray(self):
+        """
+        Return the full (n, n) table, zero where no entry is set.
+        """
+        full = zeros(self.shape, dtype=self.dtype)
+        for cell, value in self.data.items():
+            full[cell] = value
+        return full
+
+    def __array__(self, dtype=None):
+        full = self.toarray()
+        return full if dtype is None else full.astype(dtype)
+
+    def __len__(self):
+        return self.n
+
+def _upper_indices(n):
+    rows = arange(n).repeat(arange(n, 0, -1))
+    cols = arange(n*(n + 1)//2) - packed_index(rows, rows, n) + rows
+    return rows, cols
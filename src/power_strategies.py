@@ -0,0 +1,260 @@
+from numpy.core import empty_like
+
+# Exponentiation strategies used by `matrix_power`. Each one takes a square
+# (..., M, M) array `a`, a positive integer `n` and the multiplication
+# function `fmatmul`, and returns a**n.
+
+def binary_power(a, n, fmatmul):
+    """
+    Right-to-left binary exponentiation: one squaring per bit of `n` and one
+    multiplication per set bit, at most 2*log2(n) products.
+    """
+    # short-cuts.
+    if n == 1:
+        return a
+
+    elif n == 2:
+        return fmatmul(a, a)
+
+    elif n == 3:
+        return fmatmul(fmatmul(a, a), a)
+
+    # Use binary decomposition to reduce the number of matrix multiplications.
+    # Here, we iterate over the bits of n, from LSB to MSB, raise `a` to
+    # increasing powers of 2, and multiply into the result as needed.
+    z = result = None
+    while n > 0:
+        z = a if z is None else fmatmul(z, z)
+        n, bit = divmod(n, 2)
+        if bit:
+            result = z if result is None else fmatmul(result, z)
+
+    return result
+
+def binary_multiplies(n):
+    """
+    Number of products `binary_power` performs for ``n >= 1``: one
+    squaring per bit after the first, one multiplication per extra set bit.
+    """
+    return n.bit_length() - 1 + bin(n).count('1') - 1
+
+def binary_power_buffered(a, n, fmatmul, out=None):
+    """
+    The products of `binary_power`, written with `out=` into three buffers
+    of the shape of `a`: the squarings ping-pong between two of them while
+    the third holds the running result. The buffers are assigned by a dry
+    run of the bits of `n`, so the final product lands in `out` (if given)
+    without a copy. `fmatmul` must accept an `out` argument.
+    """
+    if n == 1:
+        if out is None:
+            return a
+        out[...] = a
+        return out
+
+    # short-cuts, with the same operand order as `binary_power`.
+    if n <= 3:
+        target = empty_like(a) if out is None else out
+        if n == 2:
+            return fmatmul(a, a, out=target)
+        return fmatmul(fmatmul(a, a, out=empty_like(a)), a, out=target)
+
+    ops, final = _binary_buffer_plan(n)
+    buffers = {}
+    for dst, _, _ in ops:
+        if dst not in buffers:
+            buffers[dst] = empty_like(a)
+    if out is not None:
+        buffers[final] = out
+
+    def operand(label):
+        return a if label == -1 else buffers[label]
+
+    for dst, x, y in ops:
+        fmatmul(operand(x), operand(y), out=buffers[dst])
+
+    return buffers[final]
+
+def _binary_buffer_plan(n):
+    """
+    Dry run of the LSB-to-MSB loop of `binary_power` on buffer labels 0-2.
+    Returns the products as (dst, x, y) label triples, -1 standing for
+    the input, and the label holding the result.
+    """
+    ops = []
+    free = [0, 1, 2]
+    z, result = -1, None
+    squaring = False
+    while n > 0:
+        if squaring:
+            dst = free.pop(0)
+            ops.append((dst, z, z))
+            # the old square stays alive only if the result aliases it
+            if z != -1 and z != result:
+                free.append(z)
+            z = dst
+        squaring = True
+        n, bit = divmod(n, 2)
+        if bit:
+            if result is None:
+                result = z
+            else:
+                dst = free.pop(0)
+                ops.append((dst, result, z))
+                if result != -1 and result != z:
+                    free.append(result)
+                result = dst
+    return ops, result
+
+def window_power(a, n, fmatmul, window=None):
+    """
+    Left-to-right sliding-window exponentiation. The odd powers a, a**3, ...,
+    a**(2**window - 1) are computed first; the bits of `n` are then consumed
+    in windows of up to `window` bits that end in a one, each costing one
+    multiplication by a precomputed power. Roughly log2(n) squarings plus
+    log2(n) / (window + 1) multiplications, plus 2**(window - 1) for the
+    table. `window` defaults to `window_size(n)`.
+    """
+    k = window or window_size(n)
+    odd = {1: a}
+    if k > 1:
+        a2 = fmatmul(a, a)
+        for w in range(3, 1 << k, 2):
+            odd[w] = fmatmul(odd[w - 2], a2)
+
+    bits = bin(n)[2:]
+    result = None
+    i = 0
+    while i < len(bits):
+        if bits[i] == '0':
+            result = fmatmul(result, result)
+            i += 1
+            continue
+        # the longest window starting here that ends in a set bit
+        j = min(i + k, len(bits))
+        while bits[j - 1] == '0':
+            j -= 1
+        w = int(bits[i:j], 2)
+        if result is None:
+            result = odd[w]
+        else:
+            for _ in range(j - i):
+                result = fmatmul(result, result)
+            result = fmatmul(result, odd[w])
+        i = j
+
+    return result
+
+def window_size(n):
+    """
+    The window minimizing the estimated number of products for exponent `n`.
+    """
+    bits = n.bit_length()
+    def cost(k):
+        table = 1 << (k - 1) if k > 1 else 0
+        return table + bits - 1 + bits / (k + 1.0)
+    return min(range(1, 9), key=cost)
+
+def addition_chain_power(a, n, fmatmul):
+    """
+    Follow the shortest addition chain 1 = c_0 < c_1 < ... < c_L = n from
+    `_ADDITION_CHAINS`, computing every a**c_t as a product of two earlier
+    powers. Uses the fewest possible products, L, but only for
+    n <= MAX_CHAIN_EXPONENT.
+    """
+    chain = addition_chain(n)
+    powers = {1: a}
+    for t in range(1, len(chain)):
+        c = chain[t]
+        x = next(x for x in reversed(chain[:t]) if c - x in powers)
+        powers[c] = fmatmul(powers[x], powers[c - x])
+    return powers[n]
+
+def addition_chain(n):
+    """
+    Return a shortest addition chain for `n` as a tuple starting at 1.
+    """
+    if not 1 <= n <= MAX_CHAIN_EXPONENT:
+        raise ValueError("no addition chain tabulated for %d, the table "
+                         "covers 1..%d" % (n, MAX_CHAIN_EXPONENT))
+    return _ADDITION_CHAINS[n]
+
+STRATEGIES = {
+    'binary': binary_power,
+    'window': window_power,
+    'chain': addition_chain_power,
+}
+
+# Shortest addition chains, found by exhaustive iterative-deepening search;
+# _ADDITION_CHAINS[n] ends in n.
+_ADDITION_CHAINS = (
+    None,
+    (1,), (1, 2), (1, 2, 3), (1, 2, 4), (1, 2, 4, 5), (1, 2, 4, 6),
+    (1, 2, 4, 6, 7), (1, 2, 4, 8), (1, 2, 4, 8, 9), (1, 2, 4, 8, 10),
+    (1, 2, 4, 8, 10, 11), (1, 2, 4, 8, 12), (1, 2, 4, 8, 12, 13),
+    (1, 2, 4, 8, 12, 14), (1, 2, 4, 5, 10, 15), (1, 2, 4, 8, 16),
+    (1, 2, 4, 8, 16, 17), (1, 2, 4, 8, 16, 18), (1, 2, 4, 8, 16, 18, 19),
+    (1, 2, 4, 8, 16, 20), (1, 2, 4, 8, 16, 20, 21), (1, 2, 4, 8, 16, 20, 22),
+    (1, 2, 4, 5, 9, 18, 23), (1, 2, 4, 8, 16, 24), (1, 2, 4, 8, 16, 24, 25),
+    (1, 2, 4, 8, 16, 24, 26), (1, 2, 4, 8, 9, 18, 27),
+    (1, 2, 4, 8, 16, 24, 28), (1, 2, 4, 8, 16, 24, 28, 29),
+    (1, 2, 4, 8, 10, 20, 30), (1, 2, 4, 8, 10, 20, 30, 31),
+    (1, 2, 4, 8, 16, 32), (1, 2, 4, 8, 16, 32, 33), (1, 2, 4, 8, 16, 32, 34),
+    (1, 2, 4, 8, 16, 32, 34, 35), (1, 2, 4, 8, 16, 32, 36),
+    (1, 2, 4, 8, 16, 32, 36, 37), (1, 2, 4, 8, 16, 32, 36, 38),
+    (1, 2, 4, 8, 12, 13, 26, 39), (1, 2, 4, 8, 16, 32, 40),
+    (1, 2, 4, 8, 16, 32, 40, 41), (1, 2, 4, 8, 16, 32, 40, 42),
+    (1, 2, 4, 8, 9, 17, 34, 43), (1, 2, 4, 8, 16, 32, 40, 44),
+    (1, 2, 4, 8, 9, 18, 36, 45), (1, 2, 4, 8, 10, 18, 36, 46),
+    (1, 2, 4, 8, 12, 13, 26, 39, 47), (1, 2, 4, 8, 16, 32, 48),
+    (1, 2, 4, 8, 16, 32, 48, 49), (1, 2, 4, 8, 16, 32, 48, 50),
+    (1, 2, 4, 8, 16, 17, 34, 51), (1, 2, 4, 8, 16, 32, 48, 52),
+    (1, 2, 4, 8, 16, 32, 48, 52, 53), (1, 2, 4, 8, 16, 18, 36, 54),
+    (1, 2, 4, 8, 16, 18, 36, 54, 55), (1, 2, 4, 8, 16, 32, 48, 56),
+    (1, 2, 4, 8, 16, 32, 48, 56, 57), (1, 2, 4, 8, 16, 32, 48, 56, 58),
+    (1, 2, 4, 8, 16, 17, 34, 51, 59), (1, 2, 4, 8, 16, 20, 40, 60),
+    (1, 2, 4, 8, 16, 20, 40, 60, 61), (1, 2, 4, 8, 16, 20, 40, 60, 62),
+    (1, 2, 4, 8, 16, 20, 21, 42, 63), (1, 2, 4, 8, 16, 32, 64),
+    (1, 2, 4, 8, 16, 32, 64, 65), (1, 2, 4, 8, 16, 32, 64, 66),
+    (1, 2, 4, 8, 16, 32, 64, 66, 67), (1, 2, 4, 8, 16, 32, 64, 68),
+    (1, 2, 4, 8, 16, 32, 64, 68, 69), (1, 2, 4, 8, 16, 32, 64, 68, 70),
+    (1, 2, 4, 8, 16, 32, 64, 68, 70, 71), (1, 2, 4, 8, 16, 32, 64, 72),
+    (1, 2, 4, 8, 16, 32, 64, 72, 73), (1, 2, 4, 8, 16, 32, 64, 72, 74),
+    (1, 2, 4, 8, 16, 24, 25, 50, 75), (1, 2, 4, 8, 16, 32, 64, 72, 76),
+    (1, 2, 4, 8, 9, 17, 34, 68, 77), (1, 2, 4, 8, 16, 24, 26, 52, 78),
+    (1, 2, 4, 8, 16, 24, 26, 52, 78, 79), (1, 2, 4, 8, 16, 32, 64, 80),
+    (1, 2, 4, 8, 16, 32, 64, 80, 81), (1, 2, 4, 8, 16, 32, 64, 80, 82),
+    (1, 2, 4, 8, 16, 17, 33, 66, 83), (1, 2, 4, 8, 16, 32, 64, 80, 84),
+    (1, 2, 4, 8, 16, 17, 34, 68, 85), (1, 2, 4, 8, 16, 18, 34, 68, 86),
+    (1, 2, 4, 8, 16, 24, 28, 29, 58, 87), (1, 2, 4, 8, 16, 32, 64, 80, 88),
+    (1, 2, 4, 8, 16, 32, 64, 80, 88, 89), (1, 2, 4, 8, 16, 18, 36, 72, 90),
+    (1, 2, 4, 8, 16, 24, 25, 50, 75, 91), (1, 2, 4, 8, 16, 20, 36, 72, 92),
+    (1, 2, 4, 8, 16, 20, 36, 72, 92, 93), (1, 2, 4, 8, 16, 24, 26, 52, 78, 94),
+    (1, 2, 4, 8, 16, 20, 21, 37, 74, 95), (1, 2, 4, 8, 16, 32, 64, 96),
+    (1, 2, 4, 8, 16, 32, 64, 96, 97), (1, 2, 4, 8, 16, 32, 64, 96, 98),
+    (1, 2, 4, 8, 16, 32, 33, 66, 99), (1, 2, 4, 8, 16, 32, 64, 96, 100),
+    (1, 2, 4, 8, 16, 32, 64, 96, 100, 101), (1, 2, 4, 8, 16, 32, 34, 68, 102),
+    (1, 2, 4, 8, 16, 32, 34, 68, 102, 103), (1, 2, 4, 8, 16, 32, 64, 96, 104),
+    (1, 2, 4, 8, 16, 32, 64, 96, 104, 105),
+    (1, 2, 4, 8, 16, 32, 64, 96, 104, 106),
+    (1, 2, 4, 8, 16, 32, 33, 66, 99, 107), (1, 2, 4, 8, 16, 32, 36, 72, 108),
+    (1, 2, 4, 8, 16, 32, 36, 72, 108, 109),
+    (1, 2, 4, 8, 16, 32, 36, 72, 108, 110),
+    (1, 2, 4, 8, 16, 32, 36, 37, 74, 111), (1, 2, 4, 8, 16, 32, 64, 96, 112),
+    (1, 2, 4, 8, 16, 32, 64, 96, 112, 113),
+    (1, 2, 4, 8, 16, 32, 64, 96, 112, 114),
+    (1, 2, 4, 8, 16, 32, 33, 66, 99, 115),
+    (1, 2, 4, 8, 16, 32, 64, 96, 112, 116),
+    (1, 2, 4, 8, 16, 17, 34, 50, 100, 117),
+    (1, 2, 4, 8, 16, 32, 34, 68, 102, 118),
+    (1, 2, 4, 8, 16, 17, 34, 68, 102, 119), (1, 2, 4, 8, 16, 32, 40, 80, 120),
+    (1, 2, 4, 8, 16, 32, 40, 80, 120, 121),
+    (1, 2, 4, 8, 16, 32, 40, 80, 120, 122),
+    (1, 2, 4, 8, 16, 32, 40, 41, 82, 123),
+    (1, 2, 4, 8, 16, 32, 40, 80, 120, 124),
+    (1, 2, 4, 8, 16, 24, 25, 50, 100, 125),
+    (1, 2, 4, 8, 16, 32, 40, 42, 84, 126),
+    (1, 2, 4, 8, 16, 32, 40, 42, 84, 126, 127), (1, 2, 4, 8, 16, 32, 64, 128),
+)
+
+MAX_CHAIN_EXPONENT = len(_ADDITION_CHAINS) - 1
@@ -0,0 +1,68 @@
+import sys
+
+from numpy.core import (
+    asarray, matmul, count_nonzero
+)
+
+# Sparse products denser than this are converted to dense arrays
+DEFAULT_DENSITY_THRESHOLD = 0.05
+
+def issparse(a):
+    """
+    Whether `a` is a scipy.sparse matrix or array. scipy is optional: if
+    scipy.sparse was never imported, `a` cannot be one of its objects.
+    """
+    sparse = sys.modules.get('scipy.sparse')
+    return sparse is not None and sparse.issparse(a)
+
+def sparse_identity(a):
+    """
+    CSR identity matrix with the shape and dtype of the sparse matrix `a`.
+    """
+    from scipy.sparse import identity
+    return identity(a.shape[0], dtype=a.dtype, format='csr')
+
+class DensityAdaptiveMatmul(object):
+    """
+    Multiply sparse and dense operands, keeping products sparse while they
+    stay below `threshold` density and switching to dense arrays as soon as
+    fill-in exceeds it. Every product is recorded in `representations` as a
+    ('sparse' or 'dense', density) pair.
+
+    Parameters
+    ----------
+    threshold : float
+        Largest fraction of nonzero entries kept in sparse form.
+    """
+
+    def __init__(self, threshold=DEFAULT_DENSITY_THRESHOLD):
+        self.threshold = threshold
+        self.representations = []
+
+    def __call__(self, x, y):
+        if issparse(x) and issparse(y):
+            product = x.dot(y).tocsr()
+            density = product.nnz / float(product.shape[0] * product.shape[1])
+            if density > self.threshold:
+                product = product.toarray()
+        else:
+            if issparse(x):
+                product = asarray(x.dot(y))
+            elif issparse(y):
+                product = asarray(y.T.dot(x.T)).T
+            else:
+                product = matmul(x, y)
+            density = count_nonzero(product) / float(product.size)
+
+        kind = 'sparse' if issparse(product) else 'dense'
+        self.representations.append((kind, density))
+        return product
+
+    def prepare(self, a):
+        """
+        Return `a` as CSR, or as a dense array if it is already too dense.
+        """
+        a = a.tocsr()
+        if a.nnz > self.threshold * a.shape[0] * a.shape[1]:
+            return a.toarray()
+        return a
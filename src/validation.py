@@ -0,0 +1,209 @@
+from collections import namedtuple
+from numbers import Integral
+
+from numpy.core import (
+    asanyarray, matmul, dot, ndarray
+)
+
+from src.sparse_matmul import issparse
+
+# Error object
+class LinAlgError(Exception):
+    """
+    Generic Python-exception-derived object raised by linalg functions.
+    General purpose exception class, derived from Python's exception.Exception
+    class, programmatically raised in linalg functions when a Linear
+    Algebra-related condition would prevent further correct execution of the
+    function.
+    Parameters
+    ----------
+    None
+    Examples
+    --------
+    >>> from numpy import linalg as LA
+    >>> LA.inv(np.zeros((2,2)))
+    Traceback (most recent call last):
+      File "<stdin>", line 1, in <module>
+      File "...linalg.py", line 350,
+        in inv return wrap(solve(a, identity(a.shape[0], dtype=a.dtype)))
+      File "...linalg.py", line 249,
+        in solve
+        raise LinAlgError('Singular matrix')
+    numpy.linalg.LinAlgError: Singular matrix
+    """
+    pass
+
+# Element kinds matmul handles: bool, integers, floats, complex, object
+_SUPPORTED_KINDS = 'biufcO'
+
+class PowerOperand(namedtuple('PowerOperand', ['array', 'matmul', 'sparse'])):
+    """
+    Validated input of `matrix_power`, see `prepare_power_operand`.
+
+    array : (..., M, M) ndarray or (M, M) scipy.sparse matrix
+    matmul : the multiplication to use, or None for stacks of object arrays
+    sparse : whether `array` is a scipy.sparse matrix
+    """
+    __slots__ = ()
+
+class ChainOperands(namedtuple('ChainOperands', ['arrays', 'dims'])):
+    """
+    Validated input of `multi_dot_matrix_chain_order`, see `prepare_chain`.
+
+    arrays : list of (M, N) ndarray, 1-D ends reshaped to vectors, or None
+        for a chain planned from its shapes only
+    dims : tuple p of the chain dimensions, A_i being (p[i], p[i+1])
+    """
+    __slots__ = ()
+
+def prepare_power_operand(a, check=True):
+    """
+    Validate a matrix to be powered and return a `PowerOperand` that
+    `matrix_power` accepts in place of `a`, skipping all checks next time.
+
+    Rank, squareness and dtype cost one attribute read each. With
+    `check=False` nothing is verified; use it only for inputs already
+    known to be valid.
+
+    Raises
+    ------
+    LinAlgError
+        If `a` has fewer than two dimensions or its last two differ.
+    TypeError
+        If the element type cannot be multiplied by matmul.
+    """
+    if isinstance(a, PowerOperand):
+        return a
+    return PowerOperand(*unpack_power_operand(a, check))
+
+def unpack_power_operand(a, check=True):
+    """
+    The fields of ``prepare_power_operand(a, check)`` as a plain tuple,
+    for hot loops: a `PowerOperand` is returned as is and a plain ndarray
+    goes through the checks without any conversion or wrapper object.
+    """
+    if type(a) is ndarray:
+        sparse = False
+    elif isinstance(a, PowerOperand):
+        return a
+    else:
+        sparse = issparse(a)
+        if not sparse:
+            a = asanyarray(a)
+    kind = a.dtype.kind
+    if check:
+        shape = a.shape
+        if len(shape) < 2:
+            raise LinAlgError('%d-dimensional array given. Array must be '
+                    'at least two-dimensional' % len(shape))
+        if shape[-1] != shape[-2]:
+            raise LinAlgError('Last 2 dimensions of the array must be square')
+        if kind not in _SUPPORTED_KINDS:
+            raise TypeError("matrix_power is not supported for %s arrays"
+                            % a.dtype)
+
+    # Fall back on dot for object arrays. Object arrays are not supported by
+    # the current implementation of matmul using einsum
+    if kind != 'O':
+        return a, matmul, sparse
+    return a, dot if a.ndim == 2 else None, sparse
+
+def prepare_chain(arrays, check=True):
+    """
+    Validate the factors of a matrix chain and return `ChainOperands` that
+    `multi_dot_matrix_chain_order` accepts in place of `arrays`.
+
+    As in `numpy.linalg.multi_dot`, a 1-D first factor is a row vector
+    (1, N) and a 1-D last factor a column vector (N, 1), so products with
+    them are costed at their real size; both are stored reshaped.
+
+    Every other factor must be two-dimensional with a supported dtype,
+    and its rows must match the columns of the previous factor. With
+    `check=False` the dimensions are read without any verification.
+
+    Raises
+    ------
+    ValueError
+        If `arrays` is empty.
+    LinAlgError
+        If a factor is not two-dimensional or two neighbours do not chain.
+    TypeError
+        If a factor's element type cannot be multiplied by matmul.
+    """
+    if isinstance(arrays, ChainOperands):
+        return arrays
+    if len(arrays) == 0:
+        raise ValueError("the chain must contain at least one array")
+    arrays = list(arrays)
+    if check:
+        arrays = [asanyarray(a) for a in arrays]
+    if arrays[0].ndim == 1:
+        arrays[0] = arrays[0].reshape(1, -1)
+    if arrays[-1].ndim == 1:
+        arrays[-1] = arrays[-1].reshape(-1, 1)
+    if not check:
+        dims = [a.shape[0] for a in arrays] + [arrays[-1].shape[1]]
+        return ChainOperands(arrays, tuple(dims))
+
+    for i, a in enumerate(arrays):
+        if a.dtype.kind not in _SUPPORTED_KINDS:
+            raise TypeError("array at position %d has unsupported dtype %s"
+                            % (i, a.dtype))
+    return ChainOperands(arrays, _aligned_dims([a.shape for a in arrays]))
+
+def prepare_chain_shapes(shapes, check=True):
+    """
+    Return the `ChainOperands` of a chain known only by its shapes, without
+    arrays (`arrays` is None).
+
+    `shapes` is either the dimension sequence p itself, A_i being
+    (p[i], p[i+1]), or one shape tuple per factor, where as in
+    `prepare_chain` a 1-tuple is allowed as first or last shape.
+
+    Raises
+    ------
+    ValueError
+        If `shapes` describes no factor or holds a negative dimension.
+    LinAlgError
+        If a shape is not two-dimensional or two neighbours do not chain.
+    """
+    if isinstance(shapes, ChainOperands):
+        return shapes
+    shapes = list(shapes)
+    if shapes and all(_is_integer(d) for d in shapes):
+        if len(shapes) < 2:
+            raise ValueError("the dimension sequence must contain at least "
+                             "two entries")
+        dims = tuple(int(d) for d in shapes)
+    else:
+        if len(shapes) == 0:
+            raise ValueError("the chain must contain at least one shape")
+        shapes = [tuple(int(d) for d in shape) for shape in shapes]
+        if len(shapes[0]) == 1:
+            shapes[0] = (1,) + shapes[0]
+        if len(shapes[-1]) == 1:
+            shapes[-1] = shapes[-1] + (1,)
+        if not check:
+            dims = tuple([shape[0] for shape in shapes] + [shapes[-1][1]])
+            return ChainOperands(None, dims)
+        dims = _aligned_dims(shapes)
+    if check and min(dims) < 0:
+        raise ValueError("negative dimensions are not allowed")
+    return ChainOperands(None, dims)
+
+def _aligned_dims(shapes):
+    dims = [shapes[0][0] if shapes[0] else 0]
+    for i, shape in enumerate(shapes):
+        if len(shape) != 2:
+            raise LinAlgError('%d-dimensional array given at position %d. '
+                              'Array must be two-dimensional'
+                              % (len(shape), i))
+        if shape[0] != dims[-1]:
+            raise LinAlgError('shapes %s (position %d) and %s (position %d) '
+                              'are not aligned' % (tuple(shapes[i-1]), i - 1,
+                                                   tuple(shape), i))
+        dims.append(shape[1])
+    return tuple(dims)
+
+def _is_integer(d):
+    return isinstance(d, Integral) and not isinstance(d, bool)
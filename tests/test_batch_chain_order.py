@@ -0,0 +1,64 @@
+import unittest
+import numpy as np
+
+from numpy.testing import (
+    assert_almost_equal
+)
+
+from src.batch_chain_order import batch_matrix_chain_order
+from src.chain_cost_models import MemoryCostModel
+from src.multi_dot_matrix_chain_order import matrix_chain_order_from_shapes
+
+class TestBatchChainOrder(unittest.TestCase):
+    '''
+    Tests for the method batch_matrix_chain_order
+    '''
+
+    def test_matches_planner(self):
+        '''
+        Every chain of a ragged batch gets the tables the planner returns
+        for it alone, in input order
+        '''
+        rng = np.random.RandomState(0)
+        chains = [list(rng.randint(1, 40, size=rng.randint(2, 12)))
+                  for _ in range(200)]
+        chains[7][::2] = [5] * len(chains[7][::2])  # force equal-cost splits
+        s_tables, m_tables = batch_matrix_chain_order(chains, return_costs=True)
+
+        self.assertEqual(len(s_tables), len(chains))
+        for p, s, m in zip(chains, s_tables, m_tables):
+            s_exp, m_exp = matrix_chain_order_from_shapes(p, return_costs=True)
+            upper = np.triu_indices(len(p) - 1, 1)
+            self.assertEqual(s.shape, (len(p) - 1, len(p) - 1))
+            self.assertTrue(np.all(s[upper] == s_exp[upper]))
+            assert_almost_equal(m[upper], m_exp[upper])
+
+    def test_cost_model(self):
+        '''
+        A cost model applies to every chain of the batch
+        '''
+        model = MemoryCostModel(itemsize=8, bytes_weight=0, budget=8 * 100)
+        chains = [[10, 1000, 10, 10, 1000], [10, 10, 1000, 10, 10]]
+        s_tables, m_tables = batch_matrix_chain_order(
+            chains, return_costs=True, cost_model=model)
+        for p, s, m in zip(chains, s_tables, m_tables):
+            s_exp, m_exp = matrix_chain_order_from_shapes(
+                p, return_costs=True, cost_model=model)
+            # Splits of excluded intermediates are meaningless
+            upper = np.triu_indices(4, 1)
+            feasible = m_exp[upper] < np.inf
+            self.assertTrue(np.all(m[upper] == m_exp[upper]))
+            self.assertTrue(np.all(s[upper][feasible]
+                                   == s_exp[upper][feasible]))
+
+    def test_invalid_chains(self):
+        '''
+        Chains without a matrix or with invalid dimensions are rejected
+        '''
+        with self.assertRaises(ValueError):
+            batch_matrix_chain_order([[2, 3], [4]])
+        with self.assertRaises(ValueError):
+            batch_matrix_chain_order([[2, -3]])
+        with self.assertRaises(TypeError):
+            batch_matrix_chain_order([[2.5, 3]])
+        self.assertEqual(batch_matrix_chain_order([]), [])
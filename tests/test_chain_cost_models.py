@@ -0,0 +1,88 @@
+import unittest
+import numpy as np
+
+from src.chain_cost_models import (
+    FlopsCostModel, MemoryCostModel, estimate_peak_bytes
+)
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+
+class TestChainCostModels(unittest.TestCase):
+    '''
+    Tests for the cost models accepted by multi_dot_matrix_chain_order
+    '''
+
+    def setUp(self):
+        # (AB)C needs fewer FLOPs, A(BC) a smaller intermediate
+        self.p = [2, 5, 20, 5]
+        self.arrays = [np.empty((self.p[i], self.p[i+1])) for i in range(3)]
+
+    def test_flops_is_default(self):
+        '''
+        FlopsCostModel reproduces the original cost p[i]*p[k+1]*p[j+1]
+        '''
+        s, m, peak = multi_dot_matrix_chain_order(
+            self.arrays, return_costs=True, return_peak_bytes=True)
+        s_f, m_f = multi_dot_matrix_chain_order(
+            self.arrays, return_costs=True, cost_model=FlopsCostModel())
+
+        self.assertEqual((s[0, 2], m[0, 2]), (1, 400))
+        self.assertEqual((s_f[0, 2], m_f[0, 2]), (1, 400))
+        # 2x20 intermediate plus the 2x5 result, in float64
+        self.assertEqual(peak, 8 * (40 + 10))
+
+    def test_memory_budget(self):
+        '''
+        A budget below the 2x20 intermediate forces A(BC), and a budget no
+        plan can meet raises ValueError
+        '''
+        model = MemoryCostModel(budget=200)
+        for engine in ['loop', 'vectorized', 'auto']:
+            s, m, peak = multi_dot_matrix_chain_order(
+                self.arrays, return_costs=True, engine=engine,
+                cost_model=model, return_peak_bytes=True)
+            self.assertEqual(s[0, 2], 0)
+            # FLOPs plus the bytes of BC and of the result
+            self.assertEqual(m[0, 2], 550 + 200 + 80)
+            self.assertEqual(peak, 200 + 80)
+
+        with self.assertRaises(ValueError):
+            multi_dot_matrix_chain_order(
+                self.arrays, cost_model=MemoryCostModel(budget=100))
+
+    def test_engines_agree(self):
+        '''
+        Loop and vectorized engines fill the same tables for any model
+        '''
+        rng = np.random.RandomState(0)
+        p = rng.randint(1, 30, size=9)
+        arrays = [np.empty((p[i], p[i+1])) for i in range(8)]
+        model = MemoryCostModel(itemsize=4, bytes_weight=3.,
+                                budget=4 * 200)
+        s_l, m_l = multi_dot_matrix_chain_order(
+            arrays, True, engine='loop', cost_model=model)
+        s_v, m_v = multi_dot_matrix_chain_order(
+            arrays, True, engine='vectorized', cost_model=model)
+
+        upper = np.triu_indices(8, 1)
+        self.assertTrue(np.all(m_l[upper] == m_v[upper]))
+        feasible = m_l[upper] < np.inf
+        self.assertTrue(np.all(s_l[upper][feasible] == s_v[upper][feasible]))
+
+    def test_hu_shing_rejects_other_models(self):
+        '''
+        Hu-Shing only optimizes FLOPs
+        '''
+        with self.assertRaises(ValueError):
+            multi_dot_matrix_chain_order(
+                self.arrays, engine='hu_shing', cost_model=MemoryCostModel())
+
+    def test_estimate_peak_bytes(self):
+        '''
+        Peak of ((AB)(CD)): AB and CD are alive while the result is written
+        '''
+        p = [10, 1, 10, 1, 10]
+        s = np.array([[0, 0, 1, 1],
+                      [0, 0, 0, 0],
+                      [0, 0, 0, 2],
+                      [0, 0, 0, 0]])
+        self.assertEqual(estimate_peak_bytes(s, p, itemsize=1), 100 + 100 + 100)
@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+
+from src.chain_order_cache import ChainOrderCache
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+
+def _chain(*p):
+    return [np.empty((p[i], p[i+1])) for i in range(len(p) - 1)]
+
+class TestChainOrderCache(unittest.TestCase):
+    '''
+    Tests for the class ChainOrderCache
+    '''
+
+    def test_same_plan_as_planner(self):
+        '''
+        A cached plan must be the plan the planner itself returns
+        '''
+        arrays = _chain(30, 35, 15, 5, 10, 20, 25)
+        cache = ChainOrderCache()
+
+        s, m = cache.order(arrays, return_costs=True)
+        s_exp, m_exp = multi_dot_matrix_chain_order(arrays, return_costs=True)
+
+        upper = np.triu_indices(len(arrays), 1)
+        self.assertTrue(np.all(s[upper] == s_exp[upper]))
+        self.assertTrue(np.all(m[upper] == m_exp[upper]))
+
+    def test_hits_and_misses(self):
+        '''
+        Chains with the same shapes share a plan, other shapes miss
+        '''
+        cache = ChainOrderCache()
+        first = cache.order(_chain(2, 3, 4))
+        second = cache.order(_chain(2, 3, 4))
+        cache.order(_chain(3, 3, 4))
+
+        self.assertIs(first.base, second.base)
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_lru_eviction(self):
+        '''
+        The least recently used plan is evicted once `maxsize` is exceeded
+        '''
+        cache = ChainOrderCache(maxsize=2)
+        cache.order_dims([1, 2, 3])
+        cache.order_dims([4, 5, 6])
+        cache.order_dims([1, 2, 3])  # [4, 5, 6] is now the oldest
+        cache.order_dims([7, 8, 9])
+
+        self.assertEqual(cache.evictions, 1)
+        cache.order_dims([1, 2, 3])
+        self.assertEqual(cache.hits, 2)
+        cache.order_dims([4, 5, 6])
+        self.assertEqual(cache.misses, 4)
+
+    def test_read_only(self):
+        '''
+        Shared cache entries cannot be modified by callers
+        '''
+        s, m = ChainOrderCache().order(_chain(2, 3, 4, 5), return_costs=True)
+        with self.assertRaises(ValueError):
+            s[0, 2] = 7
+        with self.assertRaises(ValueError):
+            m[0, 2] = 0.
+
+        # Writes cannot be re-enabled to corrupt the plan of later callers
+        cache = ChainOrderCache()
+        s = cache.order(_chain(2, 3, 4, 5))
+        expected = s.copy()
+        with self.assertRaises(ValueError):
+            s.setflags(write=True)
+        self.assertTrue(np.array_equal(cache.order(_chain(2, 3, 4, 5)), expected))
+
+    def test_clear(self):
+        '''
+        `clear` empties the cache and resets its counters
+        '''
+        cache = ChainOrderCache()
+        cache.order_dims([1, 2, 3])
+        cache.order_dims([1, 2, 3])
+        cache.clear()
+
+        self.assertEqual(tuple(cache.info()), (0, 0, 0, 128, 0))
+
+    def test_invalid_maxsize(self):
+        '''
+        A cache must be able to hold at least one plan
+        '''
+        with self.assertRaises(ValueError):
+            ChainOrderCache(maxsize=0)
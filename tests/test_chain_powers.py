@@ -0,0 +1,92 @@
+import unittest
+import numpy as np
+
+from numpy.testing import (
+    assert_allclose
+)
+
+from src.chain_cost_models import FlopsCostModel, estimate_peak_bytes
+from src.chain_powers import repeated_factor_runs, power_cost
+from src.multi_dot_execute import multi_dot_execute
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+from src.validation import prepare_chain_shapes
+
+class TestChainPowers(unittest.TestCase):
+    '''
+    Tests for planning and executing runs of repeated factors as powers
+    '''
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        self.A = rng.rand(50, 100)
+        self.B = rng.rand(100, 100) / 50
+        self.C = rng.rand(100, 30)
+
+    def test_runs(self):
+        '''
+        Runs are found by identity, or by content if asked to
+        '''
+        A, B, C = self.A, self.B, self.C
+        runs = repeated_factor_runs([A, B, B, B, C, C.T, C.T])
+        self.assertEqual(list(runs), [-1, 1, 1, 1, -1, -1, -1])
+        self.assertIsNone(repeated_factor_runs([A, B, B.copy(), C]))
+
+        runs = repeated_factor_runs([A, B, B.copy(), C], key='content')
+        self.assertEqual(list(runs), [-1, 1, 1, -1])
+        with self.assertRaises(ValueError):
+            repeated_factor_runs([A, B], key='hash')
+
+        self.assertEqual(power_cost(16, 10, FlopsCostModel()), 4 * 1000)
+
+    def test_power_nodes(self):
+        '''
+        A long run is cheaper as a power, and the planned chain evaluates
+        to the same product sequentially and in parallel
+        '''
+        arrays = [self.A] + [self.B] * 16 + [self.C]
+        for engine in ['loop', 'vectorized', 'auto']:
+            s, m = multi_dot_matrix_chain_order(
+                arrays, return_costs=True, engine=engine,
+                repeated='identity')
+            _, m_plain = multi_dot_matrix_chain_order(
+                arrays, return_costs=True, engine=engine)
+            self.assertLess(m[0, -1], m_plain[0, -1])
+
+        expected = np.linalg.multi_dot(arrays)
+        for workers in [None, 2]:
+            assert_allclose(multi_dot_execute(arrays, s, workers=workers),
+                            expected)
+        self.assertGreater(estimate_peak_bytes(s, [50] + [100] * 17 + [30]), 0)
+
+        # A whole chain of one factor is a single power
+        s = multi_dot_matrix_chain_order([self.B] * 8, repeated='identity',
+                                         packed=True)
+        self.assertEqual(s[0, 7], -1)
+        assert_allclose(multi_dot_execute([self.B] * 8, s),
+                        np.linalg.matrix_power(self.B, 8))
+
+    def test_vector_through_run(self):
+        '''
+        Multiplying a vector through the run beats powering it
+        '''
+        v = np.ones(100)
+        arrays = [v] + [self.B] * 16
+        s, m = multi_dot_matrix_chain_order(arrays, return_costs=True,
+                                            repeated='identity')
+        self.assertEqual(m[0, 16], 16 * 100 * 100)
+        self.assertEqual(s[0, 16], 15)
+
+        with self.assertRaises(ValueError):
+            multi_dot_matrix_chain_order(arrays, engine='hu_shing',
+                                         repeated='identity')
+
+    def test_shapes_only(self):
+        '''
+        Runs cannot be detected without the arrays: a shapes-only chain
+        raises ValueError
+        '''
+        chain = prepare_chain_shapes([(4, 4)] * 3)
+        for repeated in ['identity', 'content']:
+            with self.assertRaises(ValueError):
+                multi_dot_matrix_chain_order(chain, repeated=repeated)
+        self.assertEqual(multi_dot_matrix_chain_order(chain)[0, 2], 0)
@@ -0,0 +1,93 @@
+import unittest
+import numpy as np
+
+from src.hu_shing_chain_order import hu_shing_chain_order
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+
+def _tree_cost(s, p, i, j):
+    if i == j:
+        return 0
+    k = s[i, j]
+    return (_tree_cost(s, p, i, k) + _tree_cost(s, p, k + 1, j)
+            + p[i]*p[k+1]*p[j+1])
+
+def _tree_cost_iterative(s, p, n):
+    cost, stack = 0, [(0, n - 1)]
+    while stack:
+        i, j = stack.pop()
+        if i < j:
+            k = s[i, j]
+            cost += p[i]*p[k+1]*p[j+1]
+            stack += [(i, k), (k + 1, j)]
+    return cost
+
+class TestHuShingChainOrder(unittest.TestCase):
+    '''
+    Tests for the method hu_shing_chain_order
+    '''
+
+    def test_cormen_example(self):
+        '''
+        The textbook chain of six matrices is partitioned optimally, and the
+        split table encodes ((A1(A2A3))((A4A5)A6)) like the Cormen DP does
+        '''
+        p = [30, 35, 15, 5, 10, 20, 25]
+        s, m = hu_shing_chain_order(p, return_costs=True)
+
+        self.assertEqual(m[0, 5], 15125)
+        self.assertEqual(s[0, 5], 2)
+        self.assertEqual(s[0, 2], 0)
+        self.assertEqual(s[1, 2], 1)
+        self.assertEqual(s[3, 5], 4)
+        self.assertEqual(s[3, 4], 3)
+
+    def test_costs_follow_split_table(self):
+        '''
+        m[0, n-1] must be the cost of the parenthesization encoded by `s`
+        and stay within the Hu-Shing bound of the optimum
+        '''
+        rng = np.random.RandomState(0)
+        for _ in range(200):
+            n = rng.randint(1, 15)
+            p = list(rng.randint(1, 60, size=n + 1))
+            s, m = hu_shing_chain_order(p, return_costs=True)
+            _, m_opt = multi_dot_matrix_chain_order(
+                [np.empty((p[i], p[i+1])) for i in range(n)],
+                return_costs=True, engine='vectorized')
+
+            self.assertEqual(_tree_cost(s, p, 0, n - 1), m[0, n-1])
+            self.assertLessEqual(m[0, n-1], 1.155 * m_opt[0, n-1])
+
+    def test_tables_hold_the_split_tree_only(self):
+        '''
+        Packed, long chains are planned without n x n tables: only the
+        n - 1 cells of the split tree are stored
+        '''
+        n = 20000
+        p = list(np.random.RandomState(0).randint(1, 60, size=n + 1))
+        s, m = hu_shing_chain_order(p, return_costs=True, packed=True)
+
+        self.assertEqual(len(s.data), n - 1)
+        self.assertLessEqual(len(m.data), n - 1)
+        self.assertEqual(_tree_cost_iterative(s, p, n), m[0, n-1])
+
+        # Unpacked, long chains still get the full ndarray
+        arrays = [np.empty((2, 2)) for _ in range(1001)]
+        s = multi_dot_matrix_chain_order(arrays, engine='auto')
+        self.assertIsInstance(s, np.ndarray)
+        self.assertEqual(s.shape, (1001, 1001))
+
+    def test_auto_engine_threshold(self):
+        '''
+        engine='auto' only switches to Hu-Shing above `auto_threshold`
+        '''
+        p = [2, 9, 3, 8, 4, 7, 1]
+        arrays = [np.empty((p[i], p[i+1])) for i in range(len(p) - 1)]
+
+        _, m_dp = multi_dot_matrix_chain_order(
+            arrays, return_costs=True, engine='auto')
+        _, m_hs = multi_dot_matrix_chain_order(
+            arrays, return_costs=True, engine='auto', auto_threshold=3)
+
+        self.assertEqual(np.count_nonzero(m_dp), 15)
+        self.assertEqual(np.count_nonzero(m_hs), 5)
@@ -0,0 +1,71 @@
+import unittest
+import numpy as np
+
+from numpy.testing import (
+    assert_almost_equal
+)
+
+from src.chain_cost_models import MemoryCostModel
+from src.incremental_chain_planner import IncrementalChainPlanner
+from src.multi_dot_matrix_chain_order import (
+    matrix_chain_order_from_shapes, LinAlgError
+)
+
+class TestIncrementalChainPlanner(unittest.TestCase):
+    '''
+    Tests for the class IncrementalChainPlanner
+    '''
+
+    def test_matches_planner_after_every_append(self):
+        '''
+        After each append the tables equal a full replan of the chain
+        '''
+        rng = np.random.RandomState(0)
+        dims = rng.randint(1, 40, size=41)
+        dims[::3] = 5  # force some equal-cost splits
+        planner = IncrementalChainPlanner(capacity=4)
+
+        for n in range(1, 41):
+            cost = planner.append((dims[n-1], dims[n]))
+            s, m = matrix_chain_order_from_shapes(dims[:n+1], return_costs=True)
+
+            upper = np.triu_indices(n, 1)
+            self.assertEqual(len(planner), n)
+            self.assertTrue(np.all(planner.s[upper] == s[upper]))
+            assert_almost_equal(planner.m[upper], m[upper])
+            self.assertEqual(cost, m[0, n-1] if n > 1 else 0)
+
+    def test_memory_budget(self):
+        '''
+        Intermediates over budget are excluded as in the full planner, even
+        when they were the product of the whole chain before an append
+        '''
+        model = MemoryCostModel(itemsize=8, bytes_weight=0, budget=8 * 100)
+        dims = [10, 1000, 10, 10, 1000]
+        planner = IncrementalChainPlanner(cost_model=model)
+        for n in range(1, len(dims)):
+            cost = planner.append((dims[n-1], dims[n]))
+        s, m = matrix_chain_order_from_shapes(dims, return_costs=True,
+                                              cost_model=model)
+        self.assertEqual(cost, m[0, -1])
+        self.assertEqual(planner.s[0, 3], s[0, 3])
+
+    def test_vectors_and_alignment(self):
+        '''
+        A 1-D first factor is a row vector, a later one a column vector
+        that ends the chain; misaligned factors are rejected
+        '''
+        planner = IncrementalChainPlanner()
+        planner.append(np.empty(100))
+        planner.append(np.empty((100, 100)))
+        self.assertEqual(planner.append(np.empty(100)), 100 * 100 + 100)
+        self.assertEqual(planner.dims, (1, 100, 100, 1))
+        with self.assertRaises(ValueError):
+            planner.append((1, 5))
+
+        planner = IncrementalChainPlanner()
+        planner.append((10, 100))
+        with self.assertRaises(LinAlgError):
+            planner.append((50, 5))
+        with self.assertRaises(LinAlgError):
+            planner.append((100, 5, 5))
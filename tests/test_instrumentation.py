@@ -0,0 +1,101 @@
+import json
+import unittest
+import numpy as np
+
+from numpy.core import matmul
+
+from src import instrumentation
+from src.instrumentation import add_hook, remove_hook, instrument, recording
+from src.matrix_power import matrix_power, matrix_power_batch
+from src.multi_dot_execute import multi_dot_execute
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+
+class TestInstrumentation(unittest.TestCase):
+  '''
+  Tests for the multiply instrumentation hooks
+  '''
+
+  def test_disabled_is_free(self):
+    '''
+    Without hooks the multiplication function is used unwrapped
+    '''
+    self.assertEqual(instrumentation._hooks, [])
+    self.assertIs(instrument(matmul, 'test'), matmul)
+
+  def test_matrix_power_events(self):
+    '''
+    Every product of matrix_power is recorded with its shapes and costs
+    '''
+    A = np.array([[0., 1.], [-1., 0.]])
+    with recording() as rec:
+      _, info = matrix_power(A, 13, return_info=True)
+
+    self.assertEqual(len(rec.events), info['matmuls'])
+    event = rec.events[0]
+    self.assertEqual(event.source, 'matrix_power')
+    self.assertEqual((event.left_shape, event.right_shape), ((2, 2), (2, 2)))
+    self.assertEqual(event.dtype, 'float64')
+    self.assertEqual(event.flops, 2 * 2 * 2 * 2)
+    self.assertEqual(event.nbytes, 32)
+    self.assertGreaterEqual(event.seconds, 0)
+    # The binary ladder writes into its own buffers
+    self.assertFalse(any(e.allocated for e in rec.events))
+
+    totals = rec.totals()
+    self.assertEqual(totals['multiplies'], info['matmuls'])
+    self.assertEqual(totals['flops'], 16 * info['matmuls'])
+    json.dumps(rec.as_dicts())
+
+    # Recording stops with the block
+    matrix_power(A, 13)
+    self.assertEqual(len(rec.events), info['matmuls'])
+
+  def test_allocation_follows_the_kernel(self):
+    '''
+    A product is reported as allocated from what the kernel returned: kernels
+    writing into the out= buffers are not, the digit-split modular kernel's
+    accumulators are, and matrix_power still lands them in its buffers
+    '''
+    A = np.random.RandomState(0).randint(0, 100, size=(4, 4))
+    for modulus, allocated in [(97, False), (2 ** 45 - 55, True)]:
+      with recording() as rec:
+        result = matrix_power(A, 13, modulus=modulus)
+      self.assertTrue(all(e.allocated == allocated for e in rec.events))
+      exact = matrix_power(A.astype(object), 13) % modulus
+      self.assertTrue(np.all(result == exact))
+
+    U = np.triu(np.random.RandomState(1).random_sample((5, 5)))
+    with recording() as rec:
+      matrix_power(U, 13, detect_structure=True)
+    self.assertFalse(any(e.allocated for e in rec.events))
+
+  def test_batch_and_chain_events(self):
+    '''
+    matrix_power_batch and chain execution report their products too
+    '''
+    arrays = [np.ones((10, 100)), np.ones((100, 5)), np.ones((5, 50))]
+    s = multi_dot_matrix_chain_order(arrays)
+    with recording() as rec:
+      matrix_power_batch(np.eye(3) * 2, [4])
+      multi_dot_execute(arrays, s)
+      multi_dot_execute(arrays, s, workers=2)
+
+    sources = [e.source for e in rec.events]
+    self.assertEqual(sources.count('matrix_power_batch'), 2)
+    self.assertEqual(sources.count('multi_dot_execute'), 4)
+    chain = [e for e in rec.events if e.source == 'multi_dot_execute']
+    self.assertEqual(sum(e.flops for e in chain[:2]),
+                     2 * (10 * 100 * 5 + 10 * 5 * 50))
+
+  def test_hooks(self):
+    '''
+    Callbacks receive the events until they are removed
+    '''
+    events = []
+    add_hook(events.append)
+    try:
+      matrix_power(np.array([[1, 1], [1, 0]]), 4)
+    finally:
+      remove_hook(events.append)
+    self.assertEqual(len(events), 2)
+    self.assertEqual(instrumentation._hooks, [])
@@ -1,6 +1,7 @@
 import unittest
 import numpy as np
 from src.matrix_power import matrix_power, LinAlgError
+from src.matrix_structure import classify
 
 class TestMatrixPower(unittest.TestCase):
 
@@ -114,3 +115,101 @@ class TestMatrixPower(unittest.TestCase):
     ]
     for i, x in enumerate(exp):
       self.assertTrue(np.all(matrix_power(A, x) == expected[i]))
+
+  def test_strategies(self):
+    '''
+    Every exponentiation strategy computes the same power, and reports how many
+    matrix multiplications it needed
+    '''
+    A = np.array([[1, 1], [1, 0]], dtype=object)
+    for n in [1, 2, 3, 15, 63, 127, 128, 200, 1000]:
+      expected = matrix_power(A, n)
+      for strategy in ['binary', 'window', 'chain']:
+        result, info = matrix_power(A, n, strategy=strategy, return_info=True)
+        self.assertTrue(np.all(result == expected))
+        self.assertEqual(info['strategy'], 'window' if strategy == 'chain' and n > 128 else strategy)
+
+  def test_strategy_matmul_counts(self):
+    '''
+    For n = 15 binary needs 6 multiplications while the addition chain
+    1, 2, 4, 5, 10, 15 needs 5; large exponents benefit from sliding windows
+    '''
+    A = np.array([[0., 1.], [-1., 0.]])
+    self.assertEqual(matrix_power(A, 15, return_info=True)[1]['matmuls'], 6)
+    self.assertEqual(matrix_power(A, 15, strategy='chain', return_info=True)[1]['matmuls'], 5)
+    n = 2 ** 64 - 1
+    binary = matrix_power(A, n, return_info=True)[1]['matmuls']
+    window = matrix_power(A, n, strategy='window', return_info=True)[1]['matmuls']
+    self.assertEqual(binary, 126)
+    self.assertLess(window, 90)
+    self.assertEqual(matrix_power(A, 0, return_info=True)[1]['matmuls'], 0)
+
+  def test_invalid_strategy(self):
+    '''
+    Unknown strategies must raise ValueError
+    '''
+    with self.assertRaises(ValueError):
+      matrix_power(np.eye(2), 5, strategy='ternary')
+
+  def test_out(self):
+    '''
+    The result is written into `out` for every kind of exponent, and the buffered
+    binary method gives exactly the same result as the other strategies' products
+    '''
+    A = np.random.RandomState(0).random_sample((3, 4, 4))
+    for n in [0, 1, 2, 3, 6, 13, 100, -5]:
+      out = np.empty((3, 4, 4))
+      result = matrix_power(A, n, out=out)
+      self.assertIs(result, out)
+      self.assertTrue(np.allclose(out, matrix_power(A, n, strategy='window')))
+
+    B = np.array([[1, 1], [1, 0]], dtype=object)
+    out = np.empty((2, 2), dtype=object)
+    self.assertIs(matrix_power(B, 10, out=out), out)
+    self.assertTrue(np.all(out == [[89, 55], [55, 34]]))
+
+  def test_structure_fast_paths(self):
+    '''
+    With detection on, diagonal and permutation matrices are powered without any
+    matrix multiplication and triangular and symmetric ones keep their structure;
+    detection is off by default
+    '''
+    D = np.diag([2, 3, 5])
+    result, info = matrix_power(D, 10, detect_structure=True, return_info=True)
+    self.assertEqual((info['structure'], info['matmuls']), ('diagonal', 0))
+    self.assertTrue(np.all(result == np.diag([2 ** 10, 3 ** 10, 5 ** 10])))
+
+    P = np.eye(4, dtype=int)[[1, 2, 3, 0]]
+    result, info = matrix_power(P, 7, detect_structure=True, return_info=True)
+    self.assertEqual((info['structure'], info['matmuls']), ('permutation', 0))
+    self.assertTrue(np.all(result == matrix_power(P, 7)))
+
+    rng = np.random.RandomState(0)
+    U = np.triu(rng.random_sample((5, 5)))
+    S = U + U.T
+    for A, structure in [(U, 'upper'), (U.T, 'lower'), (S, 'symmetric')]:
+      result, info = matrix_power(A, 9, detect_structure=True, return_info=True)
+      self.assertEqual(info['structure'], structure)
+      self.assertTrue(np.allclose(result, matrix_power(A, 9)))
+
+      out = np.empty_like(A)
+      self.assertIs(matrix_power(A, 9, detect_structure=True, out=out), out)
+      self.assertTrue(np.allclose(out, result))
+
+    result, info = matrix_power(D, 10, return_info=True)
+    self.assertEqual((info['structure'], info['matmuls']), (None, 4))
+
+  def test_classify(self):
+    '''
+    The classifier's cheap first tests never decide on their own: a matrix with a
+    symmetric first row and column, or with M nonzeros, can still be general
+    '''
+    G = np.arange(16.).reshape(4, 4)
+    G[0] = G[:, 0]
+    self.assertEqual(classify(G), 'general')
+    self.assertEqual(classify(G + G.T), 'symmetric')
+    self.assertEqual(classify(np.eye(4)[[1, 2, 3, 0]] * 2), 'general')
+    self.assertEqual(classify(np.eye(4)[[1, 2, 3, 0]]), 'permutation')
+    self.assertEqual(classify(np.eye(1)), 'diagonal')
+    self.assertEqual(classify(np.array([np.eye(3), np.tril(np.ones((3, 3)))])),
+                     'lower')
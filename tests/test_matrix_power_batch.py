@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from src.matrix_power import matrix_power, matrix_power_batch, LinAlgError
+
+class TestMatrixPowerBatch(unittest.TestCase):
+
+  '''Tests for the method `matrix_power_batch`, which raises a square matrix to many powers at once'''
+
+  def test_matches_matrix_power(self):
+    '''
+    Every slice of the stacked result must equal `matrix_power` for that exponent,
+    including zero and negative exponents
+    '''
+    A = np.array([[1, 2], [2, 3]])
+    exponents = [0, 1, 2, 3, 7, 20, -1, -2]
+    result = matrix_power_batch(A, exponents)
+    self.assertEqual(result.shape, (8, 2, 2))
+    for i, n in enumerate(exponents):
+      self.assertTrue(np.allclose(result[i], matrix_power(A, n)))
+
+  def test_integer_exponents_keep_dtype(self):
+    '''
+    With only non-negative exponents the elements keep the type of the matrix
+    '''
+    A = np.array([[1, 1], [1, 0]]) # Fibonacci matrix
+    result = matrix_power_batch(A, np.array([10, 30]))
+    self.assertEqual(result.dtype, A.dtype)
+    self.assertEqual(result[0, 0, 1], 55)
+    self.assertEqual(result[1, 0, 1], 832040)
+
+  def test_stacked_matrices(self):
+    '''
+    Stacks of matrices are powered as a whole for every exponent
+    '''
+    A = np.random.RandomState(0).random_sample((3, 4, 4))
+    result = matrix_power_batch(A, [[2], [5]])
+    self.assertEqual(result.shape, (2, 1, 3, 4, 4))
+    self.assertTrue(np.allclose(result[1, 0], matrix_power(A, 5)))
+
+  def test_invalid_input(self):
+    '''
+    Non-square matrices raise LinAlgError and non-integer exponents TypeError
+    '''
+    with self.assertRaises(LinAlgError):
+      matrix_power_batch(np.ones((2, 3)), [1])
+    with self.assertRaises(TypeError):
+      matrix_power_batch(np.eye(2), [1.5, 2])
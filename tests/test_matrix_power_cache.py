@@ -0,0 +1,111 @@
+import unittest
+import numpy as np
+from src.matrix_power import matrix_power, LinAlgError
+from src.matrix_power_cache import MatrixPowerCache
+
+class TestMatrixPowerCache(unittest.TestCase):
+
+  '''Tests for the class `MatrixPowerCache`, which keeps the squarings of a matrix between calls'''
+
+  def test_same_results_as_matrix_power(self):
+    '''
+    Every power matches `matrix_power`, exactly from n = 4 on where the same
+    products are performed
+    '''
+    A = np.random.RandomState(0).random_sample((2, 4, 4))
+    cache = MatrixPowerCache(A)
+    for n in [0, 1, 2, 3, -2]:
+      self.assertTrue(np.allclose(cache.power(n), matrix_power(A, n)))
+    for n in [5, 13, 64, 100]:
+      self.assertTrue(np.array_equal(cache.power(n), matrix_power(A, n)))
+
+  def test_squarings_are_reused(self):
+    '''
+    Later calls only need the combining multiplications
+    '''
+    cache = MatrixPowerCache(np.eye(3))
+    cache.power(255)
+    misses = cache.misses
+    cache.power(170)
+    self.assertEqual(cache.misses, misses)
+    self.assertGreater(cache.hits, 0)
+
+  def test_memory_cap(self):
+    '''
+    Least recently used squarings are evicted to stay below `max_bytes`, and
+    recomputed transparently
+    '''
+    A = np.array([[1, 1], [1, 0]], dtype=np.int64)
+    cache = MatrixPowerCache(A, max_bytes=3 * A.nbytes)
+    self.assertEqual(cache.power(60)[0, 1], 1548008755920)
+    self.assertLessEqual(cache.nbytes, 3 * A.nbytes)
+    self.assertGreater(cache.evictions, 0)
+    self.assertEqual(cache.power(62)[0, 1], 4052739537881)
+
+  def test_content_key_invalidation(self):
+    '''
+    Changing the matrix in place invalidates the stored squarings
+    '''
+    A = np.array([[1, 1], [1, 0]])
+    cache = MatrixPowerCache(A)
+    cache.power(10)
+    A[1, 1] = 1
+    self.assertTrue(np.array_equal(cache.power(10), matrix_power(A, 10)))
+    self.assertEqual(cache.invalidations, 1)
+
+  def test_identity_key(self):
+    '''
+    With key='identity' the cache powers a private read-only copy: the caller's
+    array stays writable, changing it does not reach the cache, and the copy's
+    writes cannot be re-enabled
+    '''
+    A = np.array([[1, 1], [1, 0]])
+    cache = MatrixPowerCache(A, key='identity')
+    self.assertEqual(cache.power(10)[0, 1], 55)
+    A[0, 0] = 2
+    self.assertEqual(cache.power(10)[0, 1], 55)
+    with self.assertRaises(ValueError):
+      cache.a[0, 0] = 2
+    with self.assertRaises(ValueError):
+      cache.a.setflags(write=True)
+    self.assertEqual(cache.power(10)[0, 1], 55)
+    self.assertEqual(cache.invalidations, 0)
+
+    # Views are copied too
+    view_cache = MatrixPowerCache(np.eye(4)[:2, :2], key='identity')
+    self.assertTrue(np.array_equal(view_cache.power(3), np.eye(2)))
+
+  def test_results_cannot_corrupt_the_cache(self):
+    '''
+    Powers that are a stored squaring come back read-only, for either key
+    '''
+    A = np.array([[1, 1], [1, 0]])
+    for key in ['content', 'identity']:
+      cache = MatrixPowerCache(A, key=key)
+      r = cache.power(4)
+      with self.assertRaises(ValueError):
+        r[...] = 0
+      with self.assertRaises(ValueError):
+        r.setflags(write=True)
+      self.assertTrue(cache.power(12).flags.writeable)
+      self.assertEqual(cache.power(4)[0, 1], 3)
+      self.assertEqual(cache.power(12)[0, 1], 144)
+
+  def test_exponent_type(self):
+    '''
+    Non-integer exponents are rejected like in `matrix_power`
+    '''
+    cache = MatrixPowerCache(np.eye(2))
+    for n in [2.5, 2.0, '2']:
+      with self.assertRaises(TypeError):
+        cache.power(n)
+    self.assertTrue(np.array_equal(cache.power(np.int64(3)), np.eye(2)))
+
+  def test_invalid_input(self):
+    '''
+    Non-square matrices and unknown keys are rejected
+    '''
+    with self.assertRaises(LinAlgError):
+      MatrixPowerCache(np.ones((2, 3)))
+    with self.assertRaises(ValueError):
+      MatrixPowerCache(np.eye(2), key='address')
@@ -0,0 +1,85 @@
+import unittest
+import warnings
+import numpy as np
+from src.matrix_power import matrix_power
+from src.matrix_power_eig import EigenPowerDecomposition
+
+class TestMatrixPowerEig(unittest.TestCase):
+
+  '''Tests for `matrix_power(..., method='eig')` and `EigenPowerDecomposition`'''
+
+  def test_matches_squaring(self):
+    '''
+    For a well-conditioned matrix the eigendecomposition gives the same power as
+    repeated squaring within the documented tolerance, also for stacks
+    '''
+    P = np.array([[0.9, 0.1], [0.5, 0.5]])
+    for n in [1, 7, 100, -3]:
+      result, info = matrix_power(P, n, method='eig', return_info=True)
+      self.assertEqual(info['method'], 'eig')
+      self.assertTrue(np.allclose(result, matrix_power(P, n), rtol=1e-10))
+
+    A = np.random.RandomState(0).random_sample((3, 4, 4))
+    self.assertTrue(np.allclose(matrix_power(A, 9, method='eig'), matrix_power(A, 9)))
+
+  def test_complex_eigenvalues_real_result(self):
+    '''
+    A rotation has complex eigenvalues but its powers stay real
+    '''
+    t = 0.1
+    R = np.array([[np.cos(t), -np.sin(t)], [np.sin(t), np.cos(t)]])
+    result = matrix_power(R, 31, method='eig')
+    self.assertEqual(result.dtype, np.float64)
+    self.assertTrue(np.allclose(result, [[np.cos(3.1), -np.sin(3.1)], [np.sin(3.1), np.cos(3.1)]]))
+
+  def test_reused_decomposition(self):
+    '''
+    A decomposition built once serves every later exponent with one multiplication
+    '''
+    A = np.array([[2., 1.], [1., 3.]])
+    d = EigenPowerDecomposition(A)
+    for n in [5, 50]:
+      result, info = matrix_power(A, n, method='eig', decomposition=d, return_info=True)
+      self.assertEqual(info['matmuls'], 1)
+      self.assertTrue(np.allclose(result, matrix_power(A, n)))
+    with self.assertRaises(ValueError):
+      matrix_power(np.eye(3), 2, method='eig', decomposition=d)
+    with self.assertRaises(ValueError):
+      matrix_power(A, 5, decomposition=d)
+
+  def test_huge_exponents(self):
+    '''
+    Exponents beyond what the eigenvalue power handles are squared instead
+    '''
+    R = 0.9 * np.array([[0., -1.], [1., 0.]])
+    with warnings.catch_warnings():
+      warnings.simplefilter('error')
+      for n in [2**63 - 1, 2**70]:
+        result, info = matrix_power(R, n, method='eig', return_info=True)
+        self.assertEqual(info['method'], 'squaring')
+        self.assertTrue(np.all(result == 0))
+      result, info = matrix_power(R, 2**62, method='eig', return_info=True)
+      self.assertEqual(info['method'], 'eig')
+      self.assertTrue(np.allclose(result, 0))
+
+  def test_fallback_to_squaring(self):
+    '''
+    Defective float matrices and integer matrices are powered by squaring
+    '''
+    J = np.array([[1., 1.], [0., 1.]]) # Jordan block, not diagonalizable
+    self.assertFalse(EigenPowerDecomposition(J).reliable)
+    result, info = matrix_power(J, 10, method='eig', return_info=True)
+    self.assertEqual(info['method'], 'squaring')
+    self.assertTrue(np.all(result == [[1, 10], [0, 1]]))
+
+    F = np.array([[1, 1], [1, 0]])
+    result, info = matrix_power(F, 10, method='eig', return_info=True)
+    self.assertEqual(info['method'], 'squaring')
+    self.assertEqual(result[0, 1], 55)
+
+  def test_invalid_method(self):
+    '''
+    Unknown methods must raise ValueError
+    '''
+    with self.assertRaises(ValueError):
+      matrix_power(np.eye(2), 2, method='schur')
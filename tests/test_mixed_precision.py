@@ -0,0 +1,90 @@
+import unittest
+import numpy as np
+from src.matrix_power import matrix_power
+from src.mixed_precision import ErrorTrackingMatmul
+
+class TestMixedPrecision(unittest.TestCase):
+
+  '''Tests for `matrix_power(..., precision='mixed')` and `ErrorTrackingMatmul`'''
+
+  def setUp(self):
+    rng = np.random.RandomState(0)
+    self.Q = np.linalg.qr(rng.randn(64, 64))[0]
+    self.stack = np.array([np.linalg.qr(rng.randn(16, 16))[0] for _ in range(3)])
+
+  def test_error_estimate_covers_error(self):
+    '''
+    The reported estimate covers the actual error against the float64 power,
+    and the result keeps the input dtype
+    '''
+    for A in [self.Q, self.stack, self.Q * (1 + 1j)]:
+      for n in [1, 2, 17, 100]:
+        result, info = matrix_power(A, n, precision='mixed', return_info=True)
+        self.assertEqual(info['precision'], 'mixed')
+        self.assertEqual(result.dtype, A.dtype)
+        exact = matrix_power(A, n)
+        error = np.linalg.norm(result - exact) / np.linalg.norm(exact)
+        self.assertLessEqual(error, info['error_estimate'])
+        self.assertLessEqual(info['error_estimate'], 1e-4)
+
+  def test_fallback_to_double(self):
+    '''
+    A tolerance single precision cannot meet falls back to double
+    '''
+    result, info = matrix_power(self.Q, 17, precision='mixed', tol=1e-9,
+                                return_info=True)
+    self.assertEqual(info['precision'], 'full')
+    self.assertLess(info['error_estimate'], 1e-9)
+    self.assertTrue(np.allclose(result, matrix_power(self.Q, 17), rtol=0, atol=1e-12))
+
+  def test_unsupported_input(self):
+    '''
+    Other dtypes run in full precision, unknown precisions are rejected
+    '''
+    A = np.array([[1, 1], [1, 0]])
+    result, info = matrix_power(A, 10, precision='mixed', return_info=True)
+    self.assertEqual(result[0, 1], 55)
+    self.assertEqual((info['precision'], info['error_estimate']), ('full', None))
+    with self.assertRaises(ValueError):
+      matrix_power(A, 2, precision='half')
+
+  def test_switches_midway(self):
+    '''
+    Products exceeding the tolerance run in double from then on
+    '''
+    tracker = ErrorTrackingMatmul(self.Q, tol=5e-6)
+    z = tracker.start()
+    self.assertEqual(z.dtype, np.float32)
+    for _ in range(6):
+      z = tracker(z, z)
+    self.assertEqual(z.dtype, np.float64)
+    self.assertGreater(tracker.single_products, 0)
+    self.assertLess(tracker.single_products, 6)
+    with self.assertRaises(ValueError):
+      tracker(self.Q, self.Q)
+
+  def test_out(self):
+    '''
+    Products are written into `out` in single and in double precision
+    '''
+    tracker = ErrorTrackingMatmul(self.Q)
+    z = tracker.start()
+    for dtype in [np.float32, np.float64]:
+      out = np.empty((64, 64), dtype=dtype)
+      self.assertIs(tracker(z, z, out=out), out)
+      self.assertTrue(np.allclose(out, np.dot(self.Q, self.Q), atol=1e-5))
+      self.assertLess(tracker.error_estimate(out), 1e-4)
+    self.assertEqual(tracker.single_products, 2)
+
+  def test_estimates_follow_array_lifetimes(self):
+    '''
+    Estimates are dropped with their arrays, so intermediates are not kept alive
+    '''
+    tracker = ErrorTrackingMatmul(self.Q)
+    z = tracker.start()
+    for _ in range(10):
+      z = tracker(z, z)
+    self.assertEqual(len(tracker._errors), 1)
+    self.assertGreater(tracker.error_estimate(z), 0)
+    del z
+    self.assertEqual(len(tracker._errors), 0)
@@ -0,0 +1,85 @@
+import unittest
+import numpy as np
+from src.matrix_power import matrix_power
+from src.modular_matmul import modular_matmul, reduce_modulo
+
+class TestModularMatrixPower(unittest.TestCase):
+
+  '''Tests for `matrix_power(..., modulus=p)` and `modular_matmul`'''
+
+  def test_fibonacci_mod_prime(self):
+    '''
+    The Fibonacci matrix raised mod p matches exact object arithmetic reduced mod p
+    '''
+    p = 10 ** 9 + 7
+    F = np.array([[1, 1], [1, 0]])
+    exact = matrix_power(np.array(F, dtype=object), 1000)
+    for strategy in ['binary', 'window', 'chain']:
+      result = matrix_power(F, 1000, strategy=strategy, modulus=p)
+      self.assertEqual(result.dtype, np.int64)
+      self.assertTrue(np.all(result == exact % p))
+
+  def test_large_modulus_is_split(self):
+    '''
+    Products whose int64 sums would overflow are split into digits and stay exact
+    '''
+    p = 2 ** 45 - 55
+    A = np.random.RandomState(0).randint(0, 2 ** 62, size=(5, 5)) % p
+    fmatmul = modular_matmul(p, 5)
+    expected = np.dot(A.astype(object), A.astype(object)) % p
+    self.assertTrue(np.all(fmatmul(A, A) == expected))
+
+    B = np.array(A, dtype=object)
+    exact = matrix_power(B, 37) % p
+    self.assertTrue(np.all(matrix_power(B, 37, modulus=p) == exact))
+
+  def test_moduli_up_to_int64(self):
+    '''
+    Moduli too wide for a single digit of `y`, such as the Mersenne prime 2**61 - 1,
+    split both factors and stay exact
+    '''
+    rng = np.random.RandomState(1)
+    for p in [2 ** 61 - 1, 2 ** 63 - 25]:
+      for size in [2, 6]:
+        A = np.array([[int(v) * 7 % p for v in row]
+                      for row in rng.randint(0, 2 ** 62, size=(size, size))])
+        A[0, 0] = p - 1
+        exact = A.astype(object)
+        self.assertTrue(np.all(modular_matmul(p, size)(A, A) == np.dot(exact, exact) % p))
+        self.assertTrue(np.all(matrix_power(A, 11, modulus=p) == matrix_power(exact, 11) % p))
+
+  def test_stacked_and_zero_exponent(self):
+    '''
+    Stacks of integer and object matrices are supported; n = 0 gives the identity mod p
+    '''
+    A = np.arange(18).reshape(2, 3, 3)
+    expected = np.array([matrix_power(A[i].astype(object), 20) % 97 for i in range(2)])
+    self.assertTrue(np.all(matrix_power(A, 20, modulus=97) == expected))
+    self.assertTrue(np.all(matrix_power(A.astype(object), 20, modulus=97) == expected))
+    self.assertTrue(np.all(matrix_power(A, 0, modulus=1) == 0))
+
+  def test_large_uint64_entries(self):
+    '''
+    uint64 entries of 2**63 and above are reduced exactly instead of wrapping in int64
+    '''
+    A = np.array([[2 ** 64 - 1, 2 ** 63], [2 ** 63 + 5, 1]], dtype=np.uint64)
+    exact = np.array(A.tolist(), dtype=object)
+    self.assertTrue(np.all(reduce_modulo(A, 7) == exact % 7))
+    self.assertEqual(reduce_modulo(A, 7)[0, 0], 1)
+    for n in [1, 2, 9]:
+      expected = matrix_power(exact, n) % 1000003
+      self.assertTrue(np.all(matrix_power(A, n, modulus=1000003) == expected))
+
+  def test_invalid_arguments(self):
+    '''
+    Negative exponents, float matrices and oversized moduli are rejected
+    '''
+    A = np.eye(2, dtype=int)
+    with self.assertRaises(ValueError):
+      matrix_power(A, -1, modulus=7)
+    with self.assertRaises(TypeError):
+      matrix_power(np.eye(2), 3, modulus=7)
+    with self.assertRaises(ValueError):
+      modular_matmul(2 ** 63, 4)
+    with self.assertRaises(ValueError):
+      matrix_power(A, 1, modulus=2 ** 63)
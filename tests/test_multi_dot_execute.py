@@ -0,0 +1,137 @@
+import unittest
+import numpy as np
+
+from numpy.testing import assert_allclose
+
+from src.multi_dot_execute import multi_dot_execute, _plan_buffers, _schedule
+from src.multi_dot_matrix_chain_order import (
+    multi_dot_matrix_chain_order, matrix_chain_order_from_shapes
+)
+
+class TestMultiDotExecute(unittest.TestCase):
+    '''
+    Tests for the method multi_dot_execute
+    '''
+
+    def setUp(self):
+        rng = np.random.RandomState(0)
+        dims = [30, 35, 15, 5, 10, 20, 25]
+        self.arrays = [rng.random_sample((dims[i], dims[i+1]))
+                       for i in range(len(dims) - 1)]
+
+    def test_matches_multi_dot(self):
+        '''
+        The product follows `s` and equals numpy's own multi_dot
+        '''
+        s = multi_dot_matrix_chain_order(self.arrays)
+        assert_allclose(multi_dot_execute(self.arrays, s),
+                        np.linalg.multi_dot(self.arrays))
+
+    def test_out(self):
+        '''
+        The result is written into `out` when it is given
+        '''
+        s = multi_dot_matrix_chain_order(self.arrays)
+        out = np.empty((30, 25))
+        result = multi_dot_execute(self.arrays, s, out=out)
+
+        self.assertIs(result, out)
+        assert_allclose(out, np.linalg.multi_dot(self.arrays))
+
+    def test_parallel_matches_sequential(self):
+        '''
+        Evaluating independent sub-products on a thread pool gives exactly
+        the sequential result, also when writing into `out`
+        '''
+        s = multi_dot_matrix_chain_order(self.arrays)
+        expected = multi_dot_execute(self.arrays, s)
+
+        for workers in [2, 4]:
+            self.assertTrue(np.array_equal(
+                multi_dot_execute(self.arrays, s, workers=workers), expected))
+
+        out = np.empty((30, 25))
+        result = multi_dot_execute(self.arrays, s, out=out, workers=3)
+        self.assertIs(result, out)
+        self.assertTrue(np.array_equal(out, expected))
+
+    def test_parallel_errors(self):
+        '''
+        A failing product is raised in the calling thread
+        '''
+        arrays = [np.ones((2, 3)), np.ones((4, 5)), np.ones((5, 2))]
+        s = np.array([[0, 0, 0], [0, 0, 1], [0, 0, 0]])
+        with self.assertRaises(ValueError):
+            multi_dot_execute(arrays, s, workers=2)
+
+    def test_vector_ends(self):
+        '''
+        1-D ends planned by the chain planner are executed as row and column
+        vectors and their axes are dropped, as in numpy's multi_dot
+        '''
+        v, w = np.arange(30.), np.arange(25.)
+        for arrays in [[v] + self.arrays, self.arrays + [w],
+                       [v] + self.arrays + [w]]:
+            expected = np.linalg.multi_dot(arrays)
+            s = multi_dot_matrix_chain_order(arrays)
+            # The same plan from the shapes alone, 1-tuples for the vectors
+            plan = matrix_chain_order_from_shapes([a.shape for a in arrays])
+            self.assertTrue(np.array_equal(np.triu(s, 1), np.triu(plan, 1)))
+            for workers in [None, 2]:
+                result = multi_dot_execute(arrays, s, workers=workers)
+                self.assertEqual(np.shape(result), np.shape(expected))
+                assert_allclose(result, expected)
+
+                out = np.empty(np.shape(expected))
+                self.assertIs(multi_dot_execute(arrays, s, out=out,
+                                                workers=workers), out)
+                assert_allclose(out, expected)
+
+    def test_single_and_object_arrays(self):
+        '''
+        A single factor is copied, object chains fall back to `np.dot`
+        '''
+        A = np.array([[1, 2], [3, 4]], dtype=object)
+        single = multi_dot_execute([A], np.zeros((1, 1), dtype=int))
+        self.assertIsNot(single, A)
+        self.assertTrue(np.all(single == A))
+
+        s = multi_dot_matrix_chain_order([A, A, A])
+        self.assertTrue(np.all(multi_dot_execute([A, A, A], s)
+                               == [[37, 54], [81, 118]]))
+
+        # Also with workers, writing into an out= np.dot would refuse
+        s = multi_dot_matrix_chain_order([A, A, A, A])
+        out = np.empty((2, 2), dtype=object).T
+        result = multi_dot_execute([A, A, A, A], s, out=out, workers=2)
+        self.assertIs(result, out)
+        self.assertTrue(np.all(out == [[199, 290], [435, 634]]))
+
+    def test_buffers_are_reused(self):
+        '''
+        A left-deep chain of n factors ping-pongs its n - 2 intermediates
+        between two pooled buffers
+        '''
+        n = 50
+        s = np.zeros((n, n), dtype=int)
+        for j in range(1, n):
+            s[0, j] = j - 1
+        steps = _schedule(s, n)
+        slots, capacities = _plan_buffers(steps, [4] * len(steps))
+
+        self.assertEqual(len(steps), n - 1)
+        self.assertEqual(slots[-1], None)
+        self.assertEqual(capacities, [4, 4])
+
+    def test_long_chain(self):
+        '''
+        Long chains neither hit the recursion limit nor lose accuracy
+        '''
+        rng = np.random.RandomState(1)
+        arrays = [np.eye(3) + 0.01 * rng.random_sample((3, 3))
+                  for _ in range(2000)]
+        s = multi_dot_matrix_chain_order(arrays, engine='hu_shing')
+        expected = arrays[0]
+        for a in arrays[1:]:
+            expected = expected.dot(a)
+        assert_allclose(multi_dot_execute(arrays, s), expected)
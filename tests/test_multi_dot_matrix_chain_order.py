@@ -9,7 +9,9 @@ from numpy.testing import (
     assert_almost_equal
 )
 
-from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order, LinAlgError
+from src.multi_dot_matrix_chain_order import (
+    multi_dot_matrix_chain_order, matrix_chain_order_from_shapes, LinAlgError
+)
 
 class TestMultiDotMatrixchainOrder(unittest.TestCase):
     '''
@@ -110,4 +112,138 @@ class TestMultiDotMatrixchainOrder(unittest.TestCase):
         _, m = multi_dot_matrix_chain_order(arrays, return_costs=True)
 
         # Only the upper triangular part (without the diagonal) is interesting.
-        assert_almost_equal(np.triu(m), np.triu(m_expected))
\ No newline at end of file
+        assert_almost_equal(np.triu(m), np.triu(m_expected))
+
+    def test_vectorized_engine_matches_loop(self):
+        '''
+        The vectorized engine must fill the same upper triangle of `s` and `m`
+        as the reference loop, including how ties are broken
+        '''
+        rng = np.random.RandomState(0)
+        for n in [1, 2, 3, 6, 17]:
+            dims = rng.randint(1, 40, size=n + 1)
+            dims[::3] = 5  # force some equal-cost splits
+            arrays = [np.empty((dims[i], dims[i+1])) for i in range(n)]
+
+            s_loop, m_loop = multi_dot_matrix_chain_order(
+                arrays, return_costs=True, engine='loop')
+            s_vec, m_vec = multi_dot_matrix_chain_order(
+                arrays, return_costs=True, engine='vectorized')
+
+            upper = np.triu_indices(n, 1)
+            assert_almost_equal(m_vec[upper], m_loop[upper])
+            self.assertTrue(np.all(s_vec[upper] == s_loop[upper]))
+
+    def test_unknown_engine(self):
+        '''
+        Selecting an engine that does not exist must raise ValueError
+        '''
+        arrays = [np.empty((2, 3)), np.empty((3, 4))]
+        with self.assertRaises(ValueError):
+            multi_dot_matrix_chain_order(arrays, engine='fortran')
+
+    def test_vector_ends(self):
+        '''
+        A 1-D first factor is a row vector and a 1-D last factor a column
+        vector, so the product is planned starting from the vector
+        '''
+        v, A, B = np.empty(100), np.empty((100, 100)), np.empty((100, 100))
+
+        s, m = multi_dot_matrix_chain_order([v, A, B], return_costs=True)
+        self.assertEqual(s[0, 2], 1)  # (vA)B
+        self.assertEqual(m[0, 2], 2 * 100 * 100)
+
+        s, m = multi_dot_matrix_chain_order([A, B, v], return_costs=True)
+        self.assertEqual(s[0, 2], 0)  # A(Bv)
+        self.assertEqual(m[0, 2], 2 * 100 * 100)
+
+        _, m = multi_dot_matrix_chain_order([v, A, v], return_costs=True)
+        self.assertEqual(m[0, 2], 100 * 100 + 100)
+
+    def test_misaligned_shapes(self):
+        '''
+        Shapes that do not chain together are rejected before planning
+        '''
+        with self.assertRaises(LinAlgError):
+            multi_dot_matrix_chain_order([np.empty(3), np.empty((4, 2))])
+        with self.assertRaises(LinAlgError):
+            multi_dot_matrix_chain_order([np.empty((2, 3)), np.empty(3),
+                                          np.empty((3, 2))])
+
+    def test_from_shapes(self):
+        '''
+        Planning from the dimensions or the shapes gives the same tables as
+        planning from the arrays
+        '''
+        dims = [30, 35, 15, 5, 10, 20, 25]
+        arrays = [np.empty((dims[i], dims[i+1])) for i in range(6)]
+        shapes = [a.shape for a in arrays]
+        s, m = multi_dot_matrix_chain_order(arrays, return_costs=True)
+
+        upper = np.triu_indices(6, 1)
+        for chain in [dims, np.array(dims), shapes]:
+            s_shapes, m_shapes = matrix_chain_order_from_shapes(
+                chain, return_costs=True)
+            self.assertTrue(np.all(s_shapes[upper] == s[upper]))
+            assert_almost_equal(m_shapes[upper], m[upper])
+
+        # Vectors at the ends are given as 1-tuples
+        _, m = matrix_chain_order_from_shapes([(100,), (100, 100), (100,)],
+                                              return_costs=True)
+        self.assertEqual(m[0, 2], 100 * 100 + 100)
+
+        with self.assertRaises(LinAlgError):
+            matrix_chain_order_from_shapes([(10, 100), (50, 5)])
+        with self.assertRaises(ValueError):
+            matrix_chain_order_from_shapes([10])
+
+    def test_exact_integer_costs(self):
+        '''
+        Integer cost dtypes keep costs exact where doubles round them, and
+        both DP engines agree on the exact tables
+        '''
+        big = 2**20 + 1
+        dims = [big, big + 2, big + 4, big + 6, big + 8]
+        s_loop, m_loop = matrix_chain_order_from_shapes(
+            dims, return_costs=True, cost_dtype=np.int64)
+        self.assertEqual(m_loop.dtype, np.int64)
+
+        upper = np.triu_indices(4, 1)
+        for engine in ['loop', 'vectorized']:
+            for cost_dtype in [np.int64, object]:
+                s, m = matrix_chain_order_from_shapes(
+                    dims, return_costs=True, engine=engine,
+                    cost_dtype=cost_dtype)
+                self.assertTrue(np.all(s[upper] == s_loop[upper]))
+                self.assertTrue(np.all(m[upper] == m_loop[upper]))
+
+        _, m_double = matrix_chain_order_from_shapes(dims, return_costs=True)
+        self.assertNotEqual(int(m_double[0, 3]), int(m_loop[0, 3]))
+
+        _, m_hu_shing = matrix_chain_order_from_shapes(
+            dims, return_costs=True, engine='hu_shing', cost_dtype=np.int64)
+        self.assertEqual(m_hu_shing.dtype, np.int64)
+
+    def test_cost_overflow(self):
+        '''
+        int64 costs that may overflow are rejected up front, object costs
+        are exact at any size
+        '''
+        dims = [2**30, 2**30, 2**30]
+        with self.assertRaises(OverflowError):
+            matrix_chain_order_from_shapes(dims, cost_dtype=np.int64)
+
+        # Thin projections stay far below the bound of three large sides
+        _, m = matrix_chain_order_from_shapes([1, 2**21, 1, 2**21, 1],
+                                              return_costs=True,
+                                              cost_dtype=np.int64)
+        self.assertEqual(m[0, 3], 2 * 2**21 + 1)
+
+        for engine in ['loop', 'vectorized']:
+            _, m = matrix_chain_order_from_shapes(dims, return_costs=True,
+                                                  engine=engine,
+                                                  cost_dtype=object)
+            self.assertEqual(m[0, 1], 2**90)
+
+        with self.assertRaises(ValueError):
+            matrix_chain_order_from_shapes(dims, cost_dtype=np.uint64)
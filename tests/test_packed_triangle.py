@@ -0,0 +1,117 @@
+import unittest
+import numpy as np
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+from src.multi_dot_execute import multi_dot_execute
+from src.multi_dot_matrix_chain_order import matrix_chain_order_from_shapes
+from src.packed_triangle import (
+    PackedTriangle, SparseTriangle, packed_index, split_dtype
+)
+
+class TestPackedTriangle(unittest.TestCase):
+    '''
+    Tests for packed upper-triangular storage of the planner tables
+    '''
+
+    def test_round_trip(self):
+        '''
+        Packing keeps exactly the upper triangle, diagonal included
+        '''
+        a = np.arange(16).reshape(4, 4)
+        t = PackedTriangle.from_array(a)
+        self.assertEqual(len(t.data), 10)
+        self.assertTrue(np.all(t.toarray() == np.triu(a)))
+        self.assertEqual(t[1, 3], a[1, 3])
+        self.assertEqual(t[-2, -1], a[2, 3])
+
+        rows, cols = np.triu_indices(4)
+        self.assertTrue(np.all(t[rows, cols] == a[rows, cols]))
+        self.assertTrue(np.all(packed_index(rows, cols, 4) == np.arange(10)))
+
+        t[0, 2] = -1
+        self.assertEqual(t.toarray()[0, 2], -1)
+        with self.assertRaises(IndexError):
+            t[2, 1]
+
+        self.assertTrue(np.all(t[[-2, 0], [-1, -1]] == [a[2, 3], a[0, 3]]))
+        for rows, cols in [([0], [4]), ([-5], [0]), ([2], [1])]:
+            with self.assertRaises(IndexError):
+                t[rows, cols]
+
+    def test_sparse_triangle(self):
+        '''
+        A sparse table stores only the entries set, reads zero elsewhere
+        and hands out read-only views once frozen
+        '''
+        t = SparseTriangle(4, np.intp)
+        t[0, 3] = 2
+        t[-2, -1] = 1
+        self.assertEqual(t.nbytes, 2 * np.dtype(np.intp).itemsize)
+        self.assertEqual(t[0, -1], 2)
+        self.assertEqual(t[1, 3], 0)
+        self.assertTrue(np.all(t[[0, 2, 1], [3, 3, 2]] == [2, 1, 0]))
+        self.assertTrue(np.all(t[[0, -2], [-1, -1]] == [2, 1]))
+        self.assertEqual(np.count_nonzero(t), 2)
+        with self.assertRaises(IndexError):
+            t[3, 0]
+        with self.assertRaises(IndexError):
+            t[[0], [4]]
+
+        t.setflags(write=False)
+        view = t.view()
+        self.assertIs(view.data, t.data)
+        with self.assertRaises(ValueError):
+            view[0, 1] = 1
+        with self.assertRaises(ValueError):
+            view.setflags(write=True)
+
+    def test_split_dtype(self):
+        '''
+        Split points are stored in the narrowest unsigned integer type
+        '''
+        self.assertEqual(split_dtype(256), np.uint8)
+        self.assertEqual(split_dtype(257), np.uint16)
+        self.assertEqual(split_dtype(70000), np.uint32)
+
+    def test_packed_planner(self):
+        '''
+        Every engine returns the same tables packed as in full storage,
+        and the executor reads the packed split table
+        '''
+        rng = np.random.RandomState(0)
+        dims = rng.randint(1, 40, size=31)
+        upper = np.triu_indices(30, 1)
+        for engine in ['loop', 'vectorized', 'hu_shing']:
+            s, m = matrix_chain_order_from_shapes(dims, return_costs=True,
+                                                  engine=engine)
+            s_packed, m_packed = matrix_chain_order_from_shapes(
+                dims, return_costs=True, engine=engine, packed=True)
+
+            self.assertEqual(s_packed.dtype, np.uint8)
+            self.assertLess(s_packed.nbytes + m_packed.nbytes,
+                            (s.nbytes + m.nbytes) / 2)
+            self.assertTrue(np.all(s_packed[upper] == s[upper]))
+            self.assertTrue(np.all(m_packed[upper] == m[upper]))
+
+        arrays = [rng.rand(dims[i], dims[i+1]) for i in range(30)]
+        s_packed = matrix_chain_order_from_shapes(dims, packed=True)
+        np.testing.assert_allclose(multi_dot_execute(arrays, s_packed),
+                                   np.linalg.multi_dot(arrays))
+
+    @unittest.skipIf(tracemalloc is None, 'tracemalloc is not available')
+    def test_packed_loop_tables_are_never_full(self):
+        '''
+        The loop engine fills the packed tables in place: planning allocates
+        less than the two full tables would take
+        '''
+        dims = np.random.RandomState(0).randint(1, 40, size=61)
+        tracemalloc.start()
+        try:
+            matrix_chain_order_from_shapes(dims, packed=True)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, 2 * 60 * 60 * 8)
@@ -0,0 +1,61 @@
+import unittest
+import numpy as np
+from src.matrix_power import matrix_power, LinAlgError
+
+try:
+  from scipy import sparse
+except ImportError:
+  sparse = None
+
+@unittest.skipIf(sparse is None, 'scipy is not installed')
+class TestSparseMatrixPower(unittest.TestCase):
+
+  '''Tests for `matrix_power` on scipy.sparse input'''
+
+  def setUp(self):
+    # directed cycle over 200 nodes plus one chord: 0.5% dense
+    n = 200
+    rows = np.append(np.arange(n), 0)
+    cols = np.append((np.arange(n) + 1) % n, 100)
+    self.A = sparse.csr_matrix((np.ones(n + 1, dtype=np.int64), (rows, cols)), shape=(n, n))
+
+  def test_stays_sparse(self):
+    '''
+    Path counts of a very sparse graph are computed without densifying
+    '''
+    result, info = matrix_power(self.A, 10, return_info=True)
+    self.assertTrue(sparse.issparse(result))
+    self.assertTrue(np.all(result.toarray() == matrix_power(self.A.toarray(), 10)))
+    self.assertEqual(len(info['representations']), info['matmuls'])
+    self.assertTrue(all(kind == 'sparse' for kind, _ in info['representations']))
+
+  def test_switches_to_dense(self):
+    '''
+    Once fill-in passes the threshold the remaining products are dense
+    '''
+    A = self.A + sparse.eye(200, dtype=np.int64, format='csr')
+    result, info = matrix_power(A, 64, density_threshold=0.1, return_info=True)
+    kinds = [kind for kind, _ in info['representations']]
+    self.assertIsInstance(result, np.ndarray)
+    self.assertEqual(kinds[0], 'sparse')
+    self.assertEqual(kinds[-1], 'dense')
+    self.assertTrue(np.allclose(result, matrix_power(A.toarray().astype(float), 64)))
+
+  def test_zero_and_negative_exponents(self):
+    '''
+    n = 0 gives a sparse identity and negative powers go through the dense inverse
+    '''
+    identity = matrix_power(self.A, 0)
+    self.assertTrue(sparse.issparse(identity))
+    self.assertTrue(np.all(identity.toarray() == np.eye(200)))
+    P = sparse.csr_matrix(np.array([[0., 1.], [1., 0.]]))
+    self.assertTrue(np.allclose(matrix_power(P, -3), [[0, 1], [1, 0]]))
+
+  def test_invalid_input(self):
+    '''
+    Non-square sparse matrices and unsupported options are rejected
+    '''
+    with self.assertRaises(LinAlgError):
+      matrix_power(sparse.csr_matrix((2, 3)), 2)
+    with self.assertRaises(ValueError):
+      matrix_power(self.A, 2, method='eig')
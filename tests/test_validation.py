@@ -0,0 +1,100 @@
+import unittest
+import numpy as np
+
+from src import matrix_power as matrix_power_module
+from src import multi_dot_matrix_chain_order as chain_order_module
+from src.matrix_power import matrix_power
+from src.multi_dot_matrix_chain_order import multi_dot_matrix_chain_order
+from src.validation import (
+    LinAlgError, PowerOperand, ChainOperands, prepare_power_operand, prepare_chain,
+    prepare_chain_shapes, unpack_power_operand
+)
+
+class TestValidation(unittest.TestCase):
+    '''
+    Tests for the shared input validation of matrix_power and
+    multi_dot_matrix_chain_order
+    '''
+
+    def test_shared_error(self):
+        '''
+        Both modules raise the same LinAlgError class
+        '''
+        self.assertIs(matrix_power_module.LinAlgError, LinAlgError)
+        self.assertIs(chain_order_module.LinAlgError, LinAlgError)
+
+    def test_power_operand(self):
+        '''
+        A prepared operand is reused by matrix_power without validating again
+        '''
+        A = np.array([[1, 1], [1, 0]])
+        operand = prepare_power_operand(A)
+        self.assertIsInstance(operand, PowerOperand)
+        self.assertIs(prepare_power_operand(operand), operand)
+        self.assertEqual(matrix_power(operand, 10)[0, 1], 55)
+
+        for invalid in [np.ones(3), np.ones((2, 3)), np.ones((3, 2, 3))]:
+            with self.assertRaises(LinAlgError):
+                prepare_power_operand(invalid)
+        with self.assertRaises(TypeError):
+            prepare_power_operand(np.array([['a', 'b'], ['c', 'd']]))
+
+        # Unchecked input is trusted as is
+        self.assertEqual(prepare_power_operand(np.ones((2, 3)), check=False).array.shape, (2, 3))
+
+    def test_unpack_power_operand(self):
+        '''
+        The hot-path variant returns the fields without copying a plain ndarray and
+        unpacks a prepared operand
+        '''
+        A = np.ones((3, 3))
+        a, fmatmul, sparse = unpack_power_operand(A)
+        self.assertIs(a, A)
+        self.assertIs(fmatmul, np.matmul)
+        self.assertFalse(sparse)
+        self.assertEqual(tuple(unpack_power_operand(prepare_power_operand(A))), (A, np.matmul, False))
+        self.assertIs(unpack_power_operand(np.ones((2, 2), dtype=object))[1], np.dot)
+        self.assertIsNone(unpack_power_operand(np.ones((2, 2, 2), dtype=object))[1])
+        self.assertIsInstance(unpack_power_operand([[1, 2], [3, 4]])[0], np.ndarray)
+        with self.assertRaises(LinAlgError):
+            unpack_power_operand(np.ones((2, 3)))
+
+    def test_chain(self):
+        '''
+        Chain validation reads the dimensions and rejects misaligned neighbours
+        '''
+        arrays = [np.empty((10, 100)), np.empty((100, 5)), np.empty((5, 50))]
+        chain = prepare_chain(arrays)
+        self.assertIsInstance(chain, ChainOperands)
+        self.assertEqual(chain.dims, (10, 100, 5, 50))
+        upper = np.triu_indices(3, 1)
+        self.assertTrue(np.all(multi_dot_matrix_chain_order(chain)[upper]
+                               == multi_dot_matrix_chain_order(arrays)[upper]))
+
+        with self.assertRaises(LinAlgError):
+            multi_dot_matrix_chain_order([np.empty((10, 100)), np.empty((50, 5))])
+        with self.assertRaises(LinAlgError):
+            prepare_chain([np.empty((2, 2)), np.empty((2, 2, 2))])
+        with self.assertRaises(ValueError):
+            prepare_chain([])
+
+        unchecked = prepare_chain([np.empty((10, 100)), np.empty((50, 5))], check=False)
+        self.assertEqual(unchecked.dims, (10, 50, 5))
+
+    def test_chain_shapes(self):
+        '''
+        A chain given by its dimensions or shapes is read without arrays
+        '''
+        self.assertEqual(prepare_chain_shapes([10, 100, 5]),
+                         ChainOperands(None, (10, 100, 5)))
+        self.assertEqual(prepare_chain_shapes([(10, 100), (100, 5)]).dims,
+                         (10, 100, 5))
+        self.assertEqual(prepare_chain_shapes([(100,), (100, 5), (5,)]).dims,
+                         (1, 100, 5, 1))
+
+        with self.assertRaises(LinAlgError):
+            prepare_chain_shapes([(10, 100), (100,), (100, 5)])
+        with self.assertRaises(ValueError):
+            prepare_chain_shapes([10, -1])
+        with self.assertRaises(ValueError):
+            prepare_chain_shapes([])